@@ -4,5 +4,17 @@
 printenv | sed 's/^\(.*\)$/export \1/g' > /root/docker_env.sh
 chmod +x /root/docker_env.sh
 
+# Run the chat check as a resident process against a warm browser, every CHECK_INTERVAL_MINUTES
+# (restarted if it ever exits); cron only runs the monitor and retention jobs
+(
+    cd /app
+    while true; do
+        /home/seluser/venv/bin/python3 -m src.run_chats --headless --interval "${CHECK_INTERVAL_MINUTES:-30}" >> /var/log/run_chats.log 2>&1
+        status=$?
+        echo "$(date -u) run_chats exited with status $status, restarting in 60s" >> /var/log/run_chats.log
+        sleep 60
+    done
+) &
+
 # Start cron in foreground
 exec cron -f
@@ -12,18 +12,25 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-import json
 import logging
 import os
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 
 import boto3
-from botocore.exceptions import ClientError
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from dotenv import load_dotenv; load_dotenv(dotenv_path=Path(".env"), override=False)
 
+from .utils.trace import read_trace, trace_file_in
+
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL, logging.INFO),
@@ -31,6 +38,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger("monitor")
 
+# Files uploaded at once, across all folders (each large file may also be split into parts)
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "8"))
+# Error folders uploaded at once
+FOLDER_CONCURRENCY = int(os.getenv("FOLDER_CONCURRENCY", "4"))
+# Attempts per file, on top of botocore's own retries of individual requests
+UPLOAD_ATTEMPTS = int(os.getenv("UPLOAD_ATTEMPTS", "3"))
+MULTIPART_THRESHOLD_MB = int(os.getenv("MULTIPART_THRESHOLD_MB", "8"))
+
 
 class ErrorFolderMonitor:
     """Monitor artefacts/error/ directory for error folders."""
@@ -63,6 +78,15 @@ class ErrorFolderMonitor:
         self.s3_client = None
         self.sns_client = None
         self.no_delete = no_delete
+        self._upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY, thread_name_prefix="s3-upload")
+        self._stats_lock = threading.Lock()
+        self.bytes_uploaded = 0
+        self.files_uploaded = 0
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            max_concurrency=4,
+        )
 
         # Build session for boto3 clients
         session_kwargs = {}
@@ -80,7 +104,11 @@ class ErrorFolderMonitor:
 
         if s3_bucket:
             try:
-                self.s3_client = session.client('s3')
+                # One client shared by every upload thread; enough pooled connections for all of them
+                self.s3_client = session.client('s3', config=Config(
+                    retries={'max_attempts': 5, 'mode': 'adaptive'},
+                    max_pool_connections=UPLOAD_CONCURRENCY * self.transfer_config.max_concurrency,
+                ))
                 logger.info(f"S3 upload enabled: s3://{s3_bucket}/{self.s3_prefix}")
             except Exception as e:
                 logger.error(f"Failed to initialize S3 client: {e}")
@@ -100,9 +128,30 @@ class ErrorFolderMonitor:
             self.error_dir.mkdir(parents=True, exist_ok=True)
             logger.info(f"Created error directory: {self.error_dir}")
 
+    def upload_file_to_s3(self, file: Path, s3_key: str) -> int:
+        """
+        Upload one file, retrying failed attempts with exponential backoff.
+
+        Returns:
+            Number of bytes uploaded
+
+        Raises:
+            The last upload error, once UPLOAD_ATTEMPTS attempts have failed
+        """
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            try:
+                self.s3_client.upload_file(str(file), self.s3_bucket, s3_key, Config=self.transfer_config)
+                return file.stat().st_size
+            except (ClientError, BotoCoreError, S3UploadFailedError) as e:
+                if attempt == UPLOAD_ATTEMPTS:
+                    raise
+                delay = 2 ** (attempt - 1)
+                logger.warning(f"  Upload of {file.name} failed (attempt {attempt}/{UPLOAD_ATTEMPTS}), retrying in {delay}s: {e}")
+                time.sleep(delay)
+
     def upload_folder_to_s3(self, folder: Path) -> tuple[bool, Optional[str], int, str|None]:
         """
-        Upload error folder contents to S3.
+        Upload error folder contents to S3, several files at a time.
 
         Structure: PREFIX/YYYY-MM-DD/run_id/filename
 
@@ -114,7 +163,7 @@ class ErrorFolderMonitor:
         """
         if not self.s3_client or not self.s3_bucket:
             logger.warning("S3 not configured - skipping upload")
-            return False, None, 0
+            return False, None, 0, None
 
         try:
             # Get run_id from folder name
@@ -132,33 +181,39 @@ class ErrorFolderMonitor:
 
             logger.info(f"Uploading to s3://{self.s3_bucket}/{s3_path}/")
 
-            # Collect files to upload
-            trace_file = folder / "execution_trace.json"
+            # Collect files to upload (the trace may be compressed: execution_trace.json.gz/.zst)
+            trace_file = trace_file_in(folder)
             image_files = list(folder.glob("*.png"))
-            files_to_upload = [trace_file] + image_files
+            files_to_upload = ([trace_file] if trace_file else []) + image_files
 
             files_uploaded = 0
-
-            for file in sorted(files_to_upload):
-                s3_key = f"{s3_path}/{file.name}"
+            bytes_uploaded = 0
+            start = time.monotonic()
+
+            futures = {
+                self._upload_pool.submit(self.upload_file_to_s3, file, f"{s3_path}/{file.name}"): file
+                for file in sorted(files_to_upload)
+            }
+            for future in as_completed(futures):
+                file = futures[future]
                 try:
-                    self.s3_client.upload_file(
-                        str(file),
-                        self.s3_bucket,
-                        s3_key
-                    )
-                    logger.info(f"  Uploaded: {file.name} -> s3://{self.s3_bucket}/{s3_key}")
+                    bytes_uploaded += future.result()
                     files_uploaded += 1
-                except ClientError as e:
+                    logger.info(f"  Uploaded: {file.name} -> s3://{self.s3_bucket}/{s3_path}/{file.name}")
+                except Exception as e:
                     logger.error(f"  Failed to upload {file.name}: {e}")
 
-            final_health_description = None
-            with open(folder / "execution_trace.json", "r") as j:
-                execution_trace = json.load(j)
-                final_health_description = execution_trace.get("final_health_description")
+            final_health_description = read_trace(folder).get("final_health_description")
 
             total_files = len(files_to_upload)
-            logger.info(f"  Upload complete: {files_uploaded}/{total_files} files uploaded successfully")
+            elapsed = time.monotonic() - start
+            logger.info(
+                f"  Upload complete for {run_id}: {files_uploaded}/{total_files} files uploaded successfully "
+                f"({bytes_uploaded / 1024:.1f} KB in {elapsed:.2f}s, {bytes_uploaded / 1024 / 1024 / max(elapsed, 1e-6):.2f} MB/s)"
+            )
+            with self._stats_lock:
+                self.bytes_uploaded += bytes_uploaded
+                self.files_uploaded += files_uploaded
 
             return files_uploaded > 0, s3_path, files_uploaded, final_health_description
 
@@ -300,35 +355,50 @@ Please review the S3 bucket for detailed error information.
 
         logger.info(f"Found {len(folders)} error folder(s)")
         processed_successfully = 0
-
-        for folder in folders:
-            logger.info("=" * 80)
-            logger.info(f"Processing ERROR FOLDER: {folder.name}")
-            logger.info(f"Full path: {folder}")
-            logger.info(f"Created: {datetime.fromtimestamp(folder.stat().st_ctime)}")
-            logger.info("-" * 80)
-
-            # Upload to S3
-            success, s3_path, files_uploaded, final_health_description = self.upload_folder_to_s3(folder)
-
-            # Send SNS notification if upload was successful
-            if success and s3_path:
-                self.publish_sns_notification(folder, s3_path, files_uploaded, final_health_description)
-
-                # (Maybe) delete local folder after successful processing
-                if self.delete_folder(folder, no_delete=self.no_delete):
+        start = time.monotonic()
+
+        # Upload several folders at once (their files share the upload pool); notify and delete
+        # each folder here, as its upload completes
+        with ThreadPoolExecutor(max_workers=FOLDER_CONCURRENCY, thread_name_prefix="s3-folder") as folder_pool:
+            futures = {folder_pool.submit(self.upload_folder_to_s3, folder): folder for folder in folders}
+            for future in as_completed(futures):
+                if self._finish_folder(futures[future], *future.result()):
                     processed_successfully += 1
-                else:
-                    logger.warning(f"  Folder processed but failed to delete - may be reprocessed next run")
-            elif not success:
-                logger.warning(f"  Skipping SNS notification due to upload failure")
-                logger.warning(f"  Folder not deleted - will retry on next run")
-
-            logger.info("=" * 80)
 
+        elapsed = time.monotonic() - start
         logger.info(f"Successfully processed {processed_successfully}/{len(folders)} folder(s)")
+        logger.info(
+            f"Uploaded {self.files_uploaded} file(s), {self.bytes_uploaded / 1024 / 1024:.2f} MB in {elapsed:.1f}s "
+            f"({self.bytes_uploaded / 1024 / 1024 / max(elapsed, 1e-6):.2f} MB/s, "
+            f"{len(folders) / max(elapsed, 1e-6):.2f} folders/s)"
+        )
         return processed_successfully
 
+    def _finish_folder(self, folder: Path, success: bool, s3_path: Optional[str], files_uploaded: int, final_health_description: str|None) -> bool:
+        """Notify about an uploaded folder and (maybe) delete it. Returns True if fully processed."""
+        logger.info("=" * 80)
+        logger.info(f"Processed ERROR FOLDER: {folder.name}")
+        logger.info(f"Full path: {folder}")
+        logger.info(f"Created: {datetime.fromtimestamp(folder.stat().st_ctime)}")
+        logger.info("-" * 80)
+
+        processed = False
+        # Send SNS notification if upload was successful
+        if success and s3_path:
+            self.publish_sns_notification(folder, s3_path, files_uploaded, final_health_description)
+
+            # (Maybe) delete local folder after successful processing
+            if self.delete_folder(folder, no_delete=self.no_delete):
+                processed = True
+            else:
+                logger.warning(f"  Folder processed but failed to delete - may be reprocessed next run")
+        elif not success:
+            logger.warning(f"  Skipping SNS notification due to upload failure")
+            logger.warning(f"  Folder not deleted - will retry on next run")
+
+        logger.info("=" * 80)
+        return processed
+
     def run(self) -> int:
         """
         Run the monitor once - scan and process all folders, then exit.
@@ -0,0 +1,322 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+import logging
+import os
+import re
+import shutil
+import tarfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import boto3
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import BotoCoreError, ClientError
+from dotenv import load_dotenv; load_dotenv(dotenv_path=Path(".env"), override=False)
+
+from .utils.trace import read_trace, trace_file_in
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(
+    level=getattr(logging, LOG_LEVEL, logging.INFO),
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+)
+logger = logging.getLogger("retention")
+
+# Only timestamped run folders (as created by ensure_artefacts_dir) are ever touched; error/,
+# sessions/, replay/, selectors/ and archive/ do not match
+RUN_DIR_PATTERN = re.compile(r"^\d{8}-\d{6}$")
+RUN_TS_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class RunFolder:
+    """One artefacts/<ts>/ folder, holding the run_login/run_chats folders of a scheduled run."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.started = datetime.strptime(path.name, RUN_TS_FORMAT)
+        self._size: Optional[int] = None
+        self._healthy: Optional[bool] = None
+
+    @property
+    def age_days(self) -> float:
+        return (datetime.utcnow() - self.started).total_seconds() / 86400
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = sum(fp.stat().st_size for fp in self.path.rglob("*") if fp.is_file())
+        return self._size
+
+    @property
+    def healthy(self) -> bool:
+        """True if the run has at least one result and every login/chat result in it was healthy."""
+        if self._healthy is None:
+            results = [_result_healthy(folder) for folder in self.path.rglob("run_*") if folder.is_dir()]
+            results = [r for r in results if r is not None]
+            self._healthy = bool(results) and all(results)
+        return self._healthy
+
+
+def _result_healthy(folder: Path) -> Optional[bool]:
+    """Health of one run_login/run_chats folder from its trace (or replay trace), None if it has neither."""
+    trace_file = trace_file_in(folder)
+    try:
+        if trace_file is not None:
+            trace = read_trace(trace_file)
+            if folder.name == "run_login":
+                return trace.get("final_status") == "logged_in"
+            return trace.get("final_health") == "OK"
+        replay_file = folder / "replay_trace.json"
+        if replay_file.exists():
+            return bool(json.loads(replay_file.read_text(encoding="utf-8")).get("ok"))
+    except Exception as e:
+        logger.warning(f"  Unreadable trace in {folder}, treating as unhealthy: {e}")
+        return False
+    return None
+
+
+class ArtefactRetention:
+    """Apply age/count/size retention policies to artefacts/<ts>/ run folders."""
+
+    def __init__(
+        self,
+        artefacts_dir: Path = Path("artefacts"),
+        max_age_days: float = 7,
+        max_runs: int = 500,
+        max_size_mb: float = 2048,
+        keep_healthy: int = 5,
+        min_age_minutes: float = 60,
+        archive: bool = True,
+        archive_max_age_days: float = 30,
+        s3_bucket: Optional[str] = None,
+        s3_prefix: str = "",
+        aws_region: str = "eu-west-1",
+        aws_profile: Optional[str] = None,
+        dry_run: bool = False,
+    ):
+        """
+        Initialize the retention policies.
+
+        Args:
+            artefacts_dir: Path to the artefacts directory
+            max_age_days: Runs older than this are expired (0 disables)
+            max_runs: Keep at most this many runs (0 disables)
+            max_size_mb: Keep the runs' total size under this many MB (0 disables)
+            keep_healthy: The most recent N healthy runs are always kept
+            min_age_minutes: Runs younger than this are never touched (they may still be in progress)
+            archive: Compact expired runs into artefacts/archive/<date>/<ts>.tar.gz (else delete them)
+            archive_max_age_days: Local archives older than this are deleted (0 disables)
+            s3_bucket: S3 bucket to offload archives to (optional; local archives are removed once uploaded)
+            s3_prefix: S3 prefix (folder path) for archives
+            aws_region: AWS region for S3
+            aws_profile: AWS profile name (optional, uses default if not set)
+            dry_run: Only log what would be done
+        """
+        self.artefacts_dir = artefacts_dir
+        self.archive_dir = artefacts_dir / "archive"
+        self.max_age_days = max_age_days
+        self.max_runs = max_runs
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.keep_healthy = keep_healthy
+        self.min_age_days = min_age_minutes / (24 * 60)
+        self.archive = archive
+        self.archive_max_age_days = archive_max_age_days
+        self.s3_bucket = s3_bucket
+        self.s3_prefix = s3_prefix.rstrip('/') if s3_prefix else ""
+        self.dry_run = dry_run
+        self.s3_client = None
+
+        if s3_bucket:
+            session_kwargs = {}
+            if aws_region:
+                session_kwargs['region_name'] = aws_region
+            if aws_profile:
+                session_kwargs['profile_name'] = aws_profile
+            try:
+                self.s3_client = boto3.Session(**session_kwargs).client('s3')
+                logger.info(f"Archive offload enabled: s3://{s3_bucket}/{self.s3_prefix}")
+            except Exception as e:
+                logger.error(f"Failed to initialize S3 client: {e}")
+
+    def scan_runs(self) -> List[RunFolder]:
+        """All timestamped run folders, newest first."""
+        runs = []
+        if not self.artefacts_dir.exists():
+            return runs
+        for item in self.artefacts_dir.iterdir():
+            if item.is_dir() and RUN_DIR_PATTERN.match(item.name):
+                try:
+                    runs.append(RunFolder(item))
+                except ValueError:
+                    logger.warning(f"Skipping folder with an invalid timestamp: {item}")
+        runs.sort(key=lambda r: r.started, reverse=True)
+        return runs
+
+    def select_expired(self, runs: List[RunFolder]) -> Dict[Path, str]:
+        """Runs (newest first) to compact or delete, mapped to the policy that expired them."""
+        protected = set()
+        healthy_kept = 0
+        for run in runs:
+            if run.age_days < self.min_age_days:
+                protected.add(run.path)
+            elif healthy_kept < self.keep_healthy and run.healthy:
+                protected.add(run.path)
+                healthy_kept += 1
+            if healthy_kept >= self.keep_healthy and run.age_days >= self.min_age_days:
+                break
+
+        expired: Dict[Path, str] = {}
+        for i, run in enumerate(runs):
+            if run.path in protected:
+                continue
+            if self.max_age_days and run.age_days > self.max_age_days:
+                expired[run.path] = f"older than {self.max_age_days:g} days"
+            elif self.max_runs and i >= self.max_runs:
+                expired[run.path] = f"beyond the newest {self.max_runs} runs"
+
+        if self.max_size_bytes:
+            total = sum(run.size for run in runs if run.path not in expired)
+            for run in reversed(runs):
+                if total <= self.max_size_bytes:
+                    break
+                if run.path in protected or run.path in expired:
+                    continue
+                expired[run.path] = f"total size over {self.max_size_bytes / 1024 / 1024:g} MB"
+                total -= run.size
+        return expired
+
+    def archive_run(self, run: RunFolder) -> Optional[Path]:
+        """Compact a run folder into artefacts/archive/<date>/<ts>.tar.gz."""
+        archive_file = self.archive_dir / run.started.strftime("%Y-%m-%d") / f"{run.path.name}.tar.gz"
+        archive_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = archive_file.with_suffix(".tmp")
+        try:
+            with tarfile.open(tmp, "w:gz") as tar:
+                tar.add(run.path, arcname=run.path.name)
+            tmp.replace(archive_file)
+        except Exception as e:
+            logger.error(f"  Failed to archive {run.path}: {e}")
+            tmp.unlink(missing_ok=True)
+            return None
+        logger.info(f"  Archived {run.path} -> {archive_file} ({run.size / 1024:.0f} KB -> {archive_file.stat().st_size / 1024:.0f} KB)")
+        return archive_file
+
+    def offload_archive(self, archive_file: Path) -> bool:
+        """Upload an archive to S3 and remove the local copy. True if it was offloaded."""
+        if not self.s3_client:
+            return False
+        relative = archive_file.relative_to(self.archive_dir).as_posix()
+        s3_key = f"{self.s3_prefix}/{relative}" if self.s3_prefix else relative
+        try:
+            self.s3_client.upload_file(str(archive_file), self.s3_bucket, s3_key)
+        except (ClientError, BotoCoreError, S3UploadFailedError) as e:
+            logger.error(f"  Failed to upload {archive_file.name}, keeping it locally: {e}")
+            return False
+        archive_file.unlink()
+        logger.info(f"  Offloaded: {archive_file.name} -> s3://{self.s3_bucket}/{s3_key}")
+        return True
+
+    def expire_run(self, run: RunFolder, reason: str) -> bool:
+        """Archive (and maybe offload) or delete one run folder. True if the folder was removed."""
+        action = "archive" if self.archive else "delete"
+        logger.info(f"Expiring {run.path.name} ({reason}, {run.size / 1024:.0f} KB): {action}")
+        if self.dry_run:
+            return False
+        if self.archive:
+            archive_file = self.archive_run(run)
+            if archive_file is None:
+                return False
+            self.offload_archive(archive_file)
+        try:
+            shutil.rmtree(run.path)
+            return True
+        except Exception as e:
+            logger.error(f"  Failed to delete folder {run.path}: {e}")
+            return False
+
+    def prune_archives(self) -> int:
+        """Delete local archives older than archive_max_age_days. Returns the number deleted."""
+        if not self.archive_max_age_days or not self.archive_dir.exists():
+            return 0
+        cutoff = time.time() - self.archive_max_age_days * 86400
+        deleted = 0
+        for archive_file in self.archive_dir.rglob("*.tar.gz"):
+            if archive_file.stat().st_mtime >= cutoff:
+                continue
+            logger.info(f"Deleting archive older than {self.archive_max_age_days:g} days: {archive_file}")
+            if not self.dry_run:
+                archive_file.unlink()
+                deleted += 1
+        for day_dir in self.archive_dir.iterdir():
+            if day_dir.is_dir() and not any(day_dir.iterdir()) and not self.dry_run:
+                day_dir.rmdir()
+        return deleted
+
+    def run(self) -> int:
+        """
+        Apply the policies once, then exit.
+
+        Returns:
+            Number of run folders removed
+        """
+        runs = self.scan_runs()
+        total_before = sum(run.size for run in runs)
+        logger.info(f"Found {len(runs)} run folder(s), {total_before / 1024 / 1024:.1f} MB, in {self.artefacts_dir}")
+
+        expired = self.select_expired(runs)
+        removed = 0
+        freed = 0
+        for run in reversed(runs):
+            if run.path in expired and self.expire_run(run, expired[run.path]):
+                removed += 1
+                freed += run.size
+
+        archives_deleted = self.prune_archives()
+        if self.dry_run:
+            would_free = sum(run.size for run in runs if run.path in expired)
+            logger.info(f"[dry run] Would remove {len(expired)} run folder(s), freeing {would_free / 1024 / 1024:.1f} MB")
+        else:
+            logger.info(
+                f"Removed {removed} run folder(s), freeing {freed / 1024 / 1024:.1f} MB; {len(runs) - removed} remain; "
+                f"{archives_deleted} old archive(s) deleted"
+            )
+        return removed
+
+
+def main():
+    """Entry point for the retention script."""
+    retention = ArtefactRetention(
+        artefacts_dir=Path(os.getenv("ARTEFACTS_DIR", "artefacts")),
+        max_age_days=float(os.getenv("RETENTION_MAX_AGE_DAYS", "7")),
+        max_runs=int(os.getenv("RETENTION_MAX_RUNS", "500")),
+        max_size_mb=float(os.getenv("RETENTION_MAX_SIZE_MB", "2048")),
+        keep_healthy=int(os.getenv("RETENTION_KEEP_HEALTHY", "5")),
+        min_age_minutes=float(os.getenv("RETENTION_MIN_AGE_MINUTES", "60")),
+        archive=os.getenv("RETENTION_ARCHIVE", "true").lower() == "true",
+        archive_max_age_days=float(os.getenv("RETENTION_ARCHIVE_MAX_AGE_DAYS", "30")),
+        s3_bucket=os.getenv("RETENTION_S3_BUCKET"),
+        s3_prefix=os.getenv("RETENTION_S3_PREFIX", "qa-archive"),
+        aws_region=os.getenv("AWS_REGION", "eu-west-1"),
+        aws_profile=os.getenv("AWS_PROFILE"),
+        dry_run=os.getenv("RETENTION_DRY_RUN", "false").lower() == "true",
+    )
+    retention.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,14 +13,14 @@
 #  limitations under the License.
 
 import argparse
+import asyncio
 import logging
 import os
-import re
+import threading
 import time
-import json
 import random
-import uuid
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Tuple, Any, Dict, List
 from pathlib import Path
 
@@ -30,16 +30,24 @@ from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 
 from langchain_core.tools import tool
-from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, BaseMessage, ToolMessage, RemoveMessage
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, ToolMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END, MessagesState
-from langgraph.prebuilt import ToolNode
 
-from .run_login import run_login
+from .run_login import arun_login, login_profile_name, run_login
 from .utils.files import read_yaml, ensure_artefacts_dir, save_html, save_screenshot, copy_trace_to_error_folder
-from .utils.selenium import get_driver
+from .utils.history import INITIAL_HTML_MARKER, ContextBudget, prune_page_snapshots
+from .utils.html import sanitize_html
+from .utils.pacing import Pacer
+from .utils.replay import chat_health_from_results, page_fingerprint, record_replay, try_replay
+from .utils.runtime import RunContext, get_run_context
+from .utils.scheduler import ToolScheduler
+from .utils.selenium import DriverPool
+from .utils.sessions import clear_session
 from .utils.tools import build_chat_tools
+from .utils.trace import arun_and_save_execution_trace, run_and_save_execution_trace
 
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -50,180 +58,63 @@ logging.basicConfig(
 logger = logging.getLogger("chats_runner")
 
 
-# A simple global holder for artefacts dir used inside tool closure
-graph_artefacts_dir: List[str] = [""]
+def build_tools_chat():
+    """Build tools for interacting with the chat interface."""
+    return build_chat_tools()
 
 
-def contains_html(content: str) -> bool:
-    """Check if content contains substantial HTML (indicating page source dumps)."""
-    if not isinstance(content, str):
-        return False
-    # Look for common HTML patterns that indicate page source
-    html_indicators = ['<!DOCTYPE', '<html', '<head>', '<body>', '<div', '<script', '<span']
-    return any(indicator in content for indicator in html_indicators)
+class ChatState(MessagesState):
+    num_turns: int
+    turns_completed: int
+    status: str
+    health: str
+    health_description: str
+    goal: str
+    artefacts_dir: str
+    # The one page snapshot kept at full length in messages; older ones are truncated as they are superseded
+    latest_page_snapshot: Optional[ToolMessage]
 
 
-def truncate_html_tool_messages(messages: List[BaseMessage]) -> List[BaseMessage]:
-    """
-    Truncate HTML content in older ToolMessages to reduce token usage while maintaining message structure.
-    Returns both the filtered list (for immediate use) and RemoveMessage instances (for state cleanup).
-
-    Strategy:
-    - Keep all messages intact (to maintain tool_call/response pairing)
-    - For ToolMessages with HTML content, keep the LAST one at full length
-    - Truncate all EARLIER ToolMessages with HTML to first 100 and last 100 characters
-    - This preserves conversation structure and latest page state while significantly reducing tokens
+_compile_lock = threading.Lock()
+
+
+def compile_graph_chat(use_async: bool = False):
+    """Return the process-wide compiled chat graph, compiling it on first use."""
+    with _compile_lock:
+        return _compile_graph_chat(use_async)
+
+
+@lru_cache(maxsize=None)
+def _compile_graph_chat(use_async: bool):
+    """Compile the chat graph once per process (per sync/async flavour).
+
+    The tools, tool scheduler and model are built here once; the driver, artefacts dir and pacer of
+    each run are read from the RunContext in the config the app is invoked with.
     """
-    # First, identify all ToolMessages with HTML
-    tool_messages_with_html = []
-    for msg in messages:
-        if isinstance(msg, ToolMessage) and contains_html(str(msg.content)):
-            tool_messages_with_html.append(msg)
-
-    # Get the ID of the last HTML ToolMessage (to keep it full)
-    last_html_msg_id = tool_messages_with_html[-1].id if tool_messages_with_html else None
-
-    # Now process all messages
-    messages_to_return = []
-    truncated_count = 0
-
-    for msg in messages:
-        if isinstance(msg, ToolMessage) and contains_html(str(msg.content)):
-            # Keep the last HTML message at full length
-            if msg.id == last_html_msg_id:
-                messages_to_return.append(msg)
-            else:
-                # Truncate older HTML messages
-                content = str(msg.content)
-                if len(content) > 300:  # Only truncate if significantly longer than 200 chars
-                    truncated_content = content[:100] + f"\n... [truncated {len(content) - 200} characters] ...\n" + content[-100:]
-                    # Create a new ToolMessage with truncated content
-                    truncated_msg = ToolMessage(
-                        content=truncated_content,
-                        tool_call_id=msg.tool_call_id,
-                        id=msg.id
-                    )
-                    messages_to_return.append(truncated_msg)
-                    truncated_count += 1
-                else:
-                    messages_to_return.append(msg)
-        else:
-            messages_to_return.append(msg)
-
-    if truncated_count > 0:
-        logger.info(f"Truncated HTML content in {truncated_count} older ToolMessage(s), kept latest at full length")
-
-    return messages_to_return
-
-
-def build_tools_chat(driver: webdriver.Chrome):
-    """Build tools for interacting with the chat interface."""
-    return build_chat_tools(driver, graph_artefacts_dir)
-
-
-def message_to_dict(msg: BaseMessage) -> dict:
-    """Convert a LangChain message to a JSON-serializable dict."""
-    result = {"type": msg.__class__.__name__, "content": msg.content}
-    if hasattr(msg, "tool_calls") and msg.tool_calls:
-        result["tool_calls"] = [
-            {"name": tc.get("name"), "args": tc.get("args"), "id": tc.get("id")}
-            for tc in msg.tool_calls
-        ]
-    if hasattr(msg, "tool_call_id"):
-        result["tool_call_id"] = msg.tool_call_id
-    return result
-
-
-def run_and_save_execution_trace(stream, artefacts_dir: Path) -> Dict[str, Any]:
-    """Save execution trace to JSON and return final state info."""
-    trace = {
-        "run_id": str(uuid.uuid4()),
-        "run_type": artefacts_dir.name,
-        "timestamp": datetime.utcnow().isoformat(),
-        "steps": []
-    }
-    final_state = None
-
-    for step in stream:
-        final_state = step
-        step_data = {}
-        for node_name, node_state in step.items():
-            step_data[node_name] = {
-                "status": node_state.get("status"),
-                "health": node_state.get("health"),
-                "health_description": node_state.get("health_description"),
-                "goal": node_state.get("goal"),
-                "messages": [message_to_dict(msg) for msg in node_state.get("messages", [])],
-                "artefacts_dir": node_state.get("artefacts_dir"),
-            }
-        trace["steps"].append(step_data)
-        logger.debug(f"Captured step {len(trace['steps'])}: {list(step.keys())}")
-
-    if final_state:
-        for node_state in final_state.values():
-            if "status" in node_state:
-                trace["final_status"] = node_state.get("status")
-            if "health" in node_state:
-                trace["final_health"] = node_state.get("health")
-            if "health_description" in node_state:
-                trace["final_health_description"] = node_state.get("health_description")
-        trace["total_steps"] = len(trace["steps"])
-
-    trace_file = artefacts_dir / "execution_trace.json"
-    with trace_file.open("w", encoding="utf-8") as f:
-        json.dump(trace, f, indent=2, ensure_ascii=False)
-    logger.info(f"Execution trace saved to: {trace_file}")
-
-    # Try to return the final state's health and health description, otherwise return UNKNOWN
-    if final_state:
-        for node_state in final_state.values():
-            return {
-                "health": node_state.get("health", "UNKNOWN"),
-                "health_description": node_state.get("health_description", "No description"),
-            }
-    return {"health": "UNKNOWN", "health_description": "No final state"}
-
-
-def build_graph_chat(driver: webdriver.Chrome, initial_html_cleaned: str, num_turns: int, artefacts_dir: Path, goal: str):
-    """Build the LangGraph for chat interaction."""
-    tools = build_tools_chat(driver)
-    model = ChatOpenAI(model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"), temperature=0).bind_tools(tools)
-
-    class State(MessagesState):
-        num_turns: int
-        turns_completed: int
-        status: str
-        health: str
-        health_description: str
-        goal: str
-        artefacts_dir: str
-
-    def agent_node(state: State) -> Dict[str, Any]:
-        time.sleep(2)
-
-        logger.debug("[agent] invoking model with messages")
-        # Filter messages to reduce tokens for this invocation AND get RemoveMessages for state cleanup
-        messages = truncate_html_tool_messages(state["messages"])
-
-        # print summary of filtered messages
-        logger.info("Filtered messages summary:")
-        for msg in messages:
-            msg_type = type(msg).__name__
-            content = getattr(msg, "content", "")
-            logger.info(f"  {msg_type}: content length={len(content) if content is not None else 0}")
-
-        # Invoke the model with the potentially truncated messages (helps avoid token limit on this call)
-        response = model.invoke(messages)
+    tools = build_tools_chat()
+    tool_node = ToolScheduler(tools)
+    # Retries are left to Pacer, so a 429 is not also retried (unpaced) inside the openai client
+    model = ChatOpenAI(model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"), temperature=0, max_retries=0).bind_tools(tools)
+    budget = ContextBudget()
+
+    def agent_node(state: ChatState, config: RunnableConfig) -> Dict[str, Any]:
+        logger.debug(f"[agent] invoking model with {len(state['messages'])} messages")
+        messages = budget.fit(state["messages"], state.get("latest_page_snapshot"))
+        response = get_run_context(config).pacer.invoke(model, messages)
         return {"messages": [response]}
 
-    def tools_node(state: State) -> Dict[str, Any]:
-        """Execute tools and extract health/status info from report_completion calls."""
-        # Execute tools using ToolNode
-        tool_node = ToolNode(tools)
-        result = tool_node.invoke(state)
+    async def aagent_node(state: ChatState, config: RunnableConfig) -> Dict[str, Any]:
+        logger.debug(f"[agent] invoking model with {len(state['messages'])} messages")
+        messages = budget.fit(state["messages"], state.get("latest_page_snapshot"))
+        response = await get_run_context(config).pacer.ainvoke(model, messages)
+        return {"messages": [response]}
+
+    def completion_updates(state: ChatState, result: Dict[str, Any]) -> Dict[str, Any]:
+        # Older page snapshots are truncated in state once, when a newer one arrives
+        messages, latest = prune_page_snapshots(result["messages"], state.get("latest_page_snapshot"))
+        updates = {"messages": messages, "latest_page_snapshot": latest}
 
         # Check if report_completion was called and extract health info
-        updates = {"messages": result["messages"]}
         last_message = state["messages"][-1]
 
         if hasattr(last_message, "tool_calls"):
@@ -237,7 +128,17 @@ def build_graph_chat(driver: webdriver.Chrome, initial_html_cleaned: str, num_tu
 
         return updates
 
-    def check_node(state: State) -> Dict[str, Any]:
+    def tools_node(state: ChatState, config: RunnableConfig) -> Dict[str, Any]:
+        """Execute tools and extract health/status info from report_completion calls."""
+        result = tool_node.invoke(state, config)
+        return completion_updates(state, result)
+
+    async def atools_node(state: ChatState, config: RunnableConfig) -> Dict[str, Any]:
+        # The scheduler runs the (synchronous) Selenium tools in worker threads
+        result = await tool_node.ainvoke(state, config)
+        return completion_updates(state, result)
+
+    def check_node(state: ChatState) -> Dict[str, Any]:
         """Check if we've completed the required number of chat turns."""
         if state.get("status") == "completed":
             # Preserve health fields when completing
@@ -248,18 +149,18 @@ def build_graph_chat(driver: webdriver.Chrome, initial_html_cleaned: str, num_tu
             }
         return {"status": "continue"}
 
-    def should_continue(state: State):
+    def should_continue(state: ChatState):
         last_message = state["messages"][-1]
         if hasattr(last_message, "tool_calls") and last_message.tool_calls:
             return "tools"
         return "check"
 
-    def route_after_check(state: State):
+    def route_after_check(state: ChatState):
         return "end" if state.get("status") == "completed" else "loop"
 
-    graph = StateGraph(State)
-    graph.add_node("agent", agent_node)
-    graph.add_node("tools", tools_node)
+    graph = StateGraph(ChatState)
+    graph.add_node("agent", aagent_node if use_async else agent_node)
+    graph.add_node("tools", atools_node if use_async else tools_node)
     graph.add_node("check", check_node)
 
     graph.add_edge(START, "agent")
@@ -267,7 +168,26 @@ def build_graph_chat(driver: webdriver.Chrome, initial_html_cleaned: str, num_tu
     graph.add_edge("tools", "check")
     graph.add_conditional_edges("check", route_after_check, {"end": END, "loop": "agent"})
 
-    app = graph.compile()
+    logger.info(f"Compiled chat graph (async={use_async})")
+    return graph.compile()
+
+
+def build_graph_chat(
+    driver: webdriver.Chrome,
+    initial_html_cleaned: str,
+    num_turns: int,
+    artefacts_dir: Path,
+    goal: str,
+    use_async: bool = False,
+    pacer: Optional[Pacer] = None,
+) -> Tuple[Any, ChatState, RunContext]:
+    """Get the chat graph with the initial state and run context for one run.
+
+    With `use_async` the app must be driven with astream. Invoke the app with `ctx.as_config(...)`
+    so that the nodes and tools can find this run's driver.
+    """
+    app = compile_graph_chat(use_async)
+    ctx = RunContext(driver=driver, artefacts_dir=artefacts_dir, pacer=pacer or Pacer(baseline_sleep=2.0))
 
     initial_messages: List[AnyMessage] = [
         SystemMessage(content=(
@@ -280,6 +200,11 @@ def build_graph_chat(driver: webdriver.Chrome, initial_html_cleaned: str, num_tu
             "IMPORTANT: After submitting, it takes a few seconds for all LLM responses to return, the length depending on the complexity of the request of the request."
             "Whilst generating responses, the text area will become disabled somehow, and there is an extra generating spinner."
             "Use your best judgment to determine when all responses are complete or whether one or more are still generating."
+            "Prefer get_page_html(mode='compact'): it lists only visible and interactive elements with ready-to-use CSS selectors, at a fraction of the size of full HTML. Use mode='full' only if you need the raw markup. After acting on the page, call get_page_changes to see only what changed.\n"
+            "Start with get_cached_selectors: if the elements you need are cached, pass their role (e.g. prompt_box, submit_button) with an empty selector to type_text/click. When you find a selector yourself, pass a role with it so it is cached for next time ([data-pllm-id] selectors only last for the current page load and are never cached, so prefer a natural one such as #id or [name=...]).\n"
+            "Use run_actions to type the prompt and click submit in a single call.\n"
+            "Right after clicking submit, call watch_responses with a CSS selector matching the LLM response panels: it returns once all responses have finished, with per-panel timings, so you do not need to poll get_page_html.\n"
+            "For other waits, prefer the wait_for tool over sleep; it returns as soon as the page is ready.\n"
             "Keep conversation SMALL and simple - brief pleasantries like:\n"
             "- Turn 1: 'Hi' or 'Hello'\n"
             "- Turn 2: 'What's your name?' or 'How are you?'\n"
@@ -297,11 +222,11 @@ def build_graph_chat(driver: webdriver.Chrome, initial_html_cleaned: str, num_tu
         HumanMessage(content=(
             f"Instructions: {goal}\n"
             f"Number of turns to complete: {num_turns}\n"
-            f"Initial HTML (cleaned): {initial_html_cleaned}"
+            f"{INITIAL_HTML_MARKER}{initial_html_cleaned}"
         )),
     ]
 
-    state: State = {
+    state: ChatState = {
         "messages": initial_messages,
         "num_turns": num_turns,
         "turns_completed": 0,
@@ -310,24 +235,14 @@ def build_graph_chat(driver: webdriver.Chrome, initial_html_cleaned: str, num_tu
         "health_description": "",
         "goal": goal,
         "artefacts_dir": str(artefacts_dir),
+        "latest_page_snapshot": None,
     }
 
-    return app, state
-
+    return app, state, ctx
 
-def run_chats(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: str = None) -> Tuple[bool, Path]:
-    """
-    Run chat tests on a multi-LLM chat interface.
-
-    Args:
-        driver: Selenium Chrome driver that is already logged in
-        profile: Optional profile name (unused for chats, kept for API consistency)
-        run_ts: Optional timestamp for artefacts directory
 
-    Returns:
-        Tuple of (success: bool, artefacts_dir: Path)
-        success is True if health status is 'OK', False otherwise
-    """
+def _prepare_chats(driver: webdriver.Chrome, run_ts: Optional[str], artefacts_group: Optional[str], use_async: bool = False):
+    """Load config, capture the initial page and build the chat graph. Returns (artefacts_dir, app, state, ctx)."""
     load_dotenv(dotenv_path=Path(".env"), override=False)
 
     # Load configuration
@@ -339,8 +254,7 @@ def run_chats(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: s
     logger.info(f"Instructions: {goal_text}")
 
     # Setup artefacts directory
-    artefacts_dir = ensure_artefacts_dir(subfolder="run_chats", ts=run_ts)
-    graph_artefacts_dir[0] = str(artefacts_dir)
+    artefacts_dir = ensure_artefacts_dir(subfolder="run_chats", ts=run_ts, group=artefacts_group)
     logger.info(f"Artefacts directory: {artefacts_dir}")
 
     # Driver is already logged in and at the chat interface
@@ -349,8 +263,7 @@ def run_chats(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: s
     save_html(driver, artefacts_dir, "initial")
     save_screenshot(driver, artefacts_dir, "initial")
 
-    initial_html = driver.page_source
-    initial_html_cleaned = re.sub(r"<script\b[^>]*>[\s\S]*?<\/script>", "", initial_html, flags=re.IGNORECASE)
+    initial_html_cleaned = sanitize_html(driver.page_source)
 
     # Determine number of turns (1 or 2 random)
     num_turns = random.randint(1, 2)
@@ -358,15 +271,33 @@ def run_chats(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: s
 
     # Build and execute the graph
     logger.info("Building chat interaction graph...")
-    app, state = build_graph_chat(driver, initial_html_cleaned, num_turns, artefacts_dir, goal_text)
-    logger.info("Graph compiled. Beginning execution loop...")
+    app, state, ctx = build_graph_chat(driver, initial_html_cleaned, num_turns, artefacts_dir, goal_text, use_async=use_async)
+    ctx.replay_key = page_fingerprint(driver)
+    logger.info("Graph ready. Beginning execution loop...")
+    return artefacts_dir, app, state, ctx
+
+
+def _replay_chats(ctx: RunContext) -> Optional[Dict[str, Any]]:
+    """Replay the recorded chat for this page, if any, returning the final state info on success.
+
+    Health is derived from the replayed watch_responses results. On failure the start page is
+    reloaded so the agent begins from a clean chat.
+    """
+    start_url = ctx.driver.current_url
+    ok, detail = try_replay("run_chats", ctx.replay_key, build_tools_chat(), ctx, chat_health_from_results)
+    if ok:
+        return {"health": "OK", "health_description": detail}
+    ctx.driver.get(start_url)
+    return None
 
-    # Execute the agent
-    final_state_info = run_and_save_execution_trace(
-        app.stream(state, config={"recursion_limit": 100}),
-        artefacts_dir
-    )
 
+def _record_chats(ctx: RunContext, final_state_info: Dict[str, Any]) -> None:
+    if final_state_info.get("health") == "OK":
+        # A replay is verified from its watch_responses results, so runs without one are not recorded
+        record_replay("run_chats", ctx.replay_key, final_state_info["trace_file"], required_tools=("watch_responses",))
+
+
+def _finish_chats(driver: webdriver.Chrome, artefacts_dir: Path, final_state_info: Dict[str, Any]) -> Tuple[bool, Path]:
     # Extract health status
     health = final_state_info.get("health", "UNKNOWN")
     health_description = final_state_info.get("health_description", "No description")
@@ -384,28 +315,135 @@ def run_chats(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: s
     return success, artefacts_dir
 
 
+def run_chats(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: str = None, artefacts_group: Optional[str] = None) -> Tuple[bool, Path]:
+    """
+    Run chat tests on a multi-LLM chat interface.
+
+    Args:
+        driver: Selenium Chrome driver that is already logged in
+        profile: Optional profile name (unused for chats, kept for API consistency)
+        run_ts: Optional timestamp for artefacts directory
+        artefacts_group: Optional sub-folder (e.g. the profile name) to keep concurrent runs apart
+
+    Returns:
+        Tuple of (success: bool, artefacts_dir: Path)
+        success is True if health status is 'OK', False otherwise
+    """
+    artefacts_dir, app, state, ctx = _prepare_chats(driver, run_ts, artefacts_group)
+
+    final_state_info = _replay_chats(ctx)
+    if final_state_info is None:
+        # Execute the agent
+        final_state_info = run_and_save_execution_trace(
+            app.stream(state, config=ctx.as_config(recursion_limit=100)),
+            artefacts_dir
+        )
+        ctx.pacer.log_summary("run_chats")
+        _record_chats(ctx, final_state_info)
+
+    return _finish_chats(driver, artefacts_dir, final_state_info)
+
+
+async def arun_chats(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: str = None, artefacts_group: Optional[str] = None) -> Tuple[bool, Path]:
+    """Async variant of run_chats: the graph runs with astream and Selenium calls run in worker threads."""
+    artefacts_dir, app, state, ctx = await asyncio.to_thread(_prepare_chats, driver, run_ts, artefacts_group, True)
+
+    final_state_info = await asyncio.to_thread(_replay_chats, ctx)
+    if final_state_info is None:
+        final_state_info = await arun_and_save_execution_trace(
+            app.astream(state, config=ctx.as_config(recursion_limit=100)),
+            artefacts_dir
+        )
+        ctx.pacer.log_summary("run_chats")
+        await asyncio.to_thread(_record_chats, ctx, final_state_info)
+
+    return await asyncio.to_thread(_finish_chats, driver, artefacts_dir, final_state_info)
+
+
+def run_login_and_chats(
+    driver: webdriver.Chrome,
+    profile: Optional[str] = None,
+    run_ts: str = None,
+    reuse_session: bool = True,
+    artefacts_group: Optional[str] = None,
+) -> Tuple[bool, bool, Path]:
+    """Run the full login -> chats check on one driver, copying traces of failed flows to the error folder."""
+    run_ts = run_ts or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+
+    logger.info("Invoking run_login()...")
+    login_ok, login_out = run_login(driver, profile=profile, run_ts=run_ts, reuse_session=reuse_session, artefacts_group=artefacts_group)
+    if not login_ok:
+        copy_trace_to_error_folder(login_out)
+    logger.info(f"login_success={login_ok} artefacts_dir={login_out}")
+
+    time.sleep(10)
+
+    logger.info("Invoking run_chats()...")
+    chats_ok, chats_out = run_chats(driver, profile=profile, run_ts=run_ts, artefacts_group=artefacts_group)
+    if not chats_ok:
+        copy_trace_to_error_folder(chats_out)
+        if reuse_session:
+            # The saved session may have looked logged in but be expired; log in afresh next run
+            clear_session(driver, login_profile_name(profile))
+    logger.info(f"chats_success={chats_ok} artefacts_dir={chats_out}")
+
+    return login_ok, chats_ok, chats_out
+
+
+async def arun_login_and_chats(
+    driver: webdriver.Chrome,
+    profile: Optional[str] = None,
+    run_ts: str = None,
+    reuse_session: bool = True,
+    artefacts_group: Optional[str] = None,
+) -> Tuple[bool, bool, Path]:
+    """Async variant of run_login_and_chats."""
+    run_ts = run_ts or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+
+    logger.info("Invoking arun_login()...")
+    login_ok, login_out = await arun_login(driver, profile=profile, run_ts=run_ts, reuse_session=reuse_session, artefacts_group=artefacts_group)
+    if not login_ok:
+        await asyncio.to_thread(copy_trace_to_error_folder, login_out)
+    logger.info(f"login_success={login_ok} artefacts_dir={login_out}")
+
+    await asyncio.sleep(10)
+
+    logger.info("Invoking arun_chats()...")
+    chats_ok, chats_out = await arun_chats(driver, profile=profile, run_ts=run_ts, artefacts_group=artefacts_group)
+    if not chats_ok:
+        await asyncio.to_thread(copy_trace_to_error_folder, chats_out)
+        if reuse_session:
+            # The saved session may have looked logged in but be expired; log in afresh next run
+            await asyncio.to_thread(clear_session, driver, login_profile_name(profile))
+    logger.info(f"chats_success={chats_ok} artefacts_dir={chats_out}")
+
+    return login_ok, chats_ok, chats_out
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run QA test for the chat interface")
     parser.add_argument("--headless", action="store_true", help="Run in headless mode")
+    parser.add_argument("--no-session", action="store_true", help="Ignore saved sessions and always run the login graph")
+    parser.add_argument("--interval", type=float, default=None, help="Keep running, repeating the check every INTERVAL minutes against a warm browser pool")
+    parser.add_argument("--max-uses", type=int, default=int(os.getenv("DRIVER_MAX_USES", "20")), help="Recycle a browser after this many checks")
     args = parser.parse_args()
     logger.info(f"Running in headless mode: {args.headless}")
 
-    run_ts = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
-    with get_driver(headless=args.headless) as driver:
-        logger.info("Invoking run_login()...")
-        ok, out = run_login(driver, run_ts=run_ts)
-        if not ok:
-            copy_trace_to_error_folder(out)
-
-        time.sleep(10)
-
-        logger.info("Invoking run_chats()...")
-        ok, out = run_chats(driver, run_ts=run_ts)
-        if not ok:
-            copy_trace_to_error_folder(out)
-
-        # Final digest
-        logger.info(f"login_success={ok} artefacts_dir={out}")
-        logger.info(f"chats_success={ok} artefacts_dir={out}")
-
-
+    # Checks run one after another, so a single warm browser is all the loop can use
+    with DriverPool(size=1, max_uses=args.max_uses, headless=args.headless) as pool:
+        pool.warm()
+        while True:
+            started = time.monotonic()
+            try:
+                with pool.lease() as driver:
+                    run_login_and_chats(driver, reuse_session=not args.no_session)
+            except Exception as e:
+                if args.interval is None:
+                    raise
+                logger.error(f"Check failed with an unexpected error: {e}", exc_info=True)
+
+            if args.interval is None:
+                break
+            pause = max(0.0, args.interval * 60 - (time.monotonic() - started))
+            logger.info(f"Next check in {pause:.0f}s")
+            time.sleep(pause)
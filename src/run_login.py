@@ -13,13 +13,13 @@
 #  limitations under the License.
 
 import argparse
-import json
+import asyncio
 import logging
 import os
-import re
+import threading
 import time
-import uuid
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -29,18 +29,28 @@ from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 
 from langchain_core.tools import tool
-from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, BaseMessage
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END, MessagesState
-from langgraph.prebuilt import ToolNode
 
 from . utils.files import read_yaml, ensure_artefacts_dir, save_html, save_screenshot, copy_trace_to_error_folder
+from . utils.history import INITIAL_HTML_MARKER, ContextBudget, prune_page_snapshots
+from . utils.html import sanitize_html
+from . utils.pacing import Pacer
+from . utils.replay import page_fingerprint, record_replay, try_replay
+from . utils.runtime import RunContext, get_run_context
+from . utils.scheduler import ToolScheduler
 from . utils.selenium import get_driver
-from . utils.tools import build_login_tools
+from . utils.sessions import clear_session, restore_session, save_session
+from . utils.tools import build_login_tools, wait_for_condition
+from . utils.trace import arun_and_save_execution_trace, run_and_save_execution_trace
 
 
 BASE_URL = "https://chat.parallellm.com"
+# Max seconds to let a restored session's page settle (client-side redirects included) before validating it
+SESSION_SETTLE_TIMEOUT = float(os.getenv("SESSION_SETTLE_TIMEOUT", "10"))
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
@@ -61,35 +71,73 @@ def _is_logged_in(driver: webdriver.Chrome) -> bool:
         return True
 
 
-def build_tools(driver: webdriver.Chrome, creds: Dict[str, str]):
+def build_tools():
     """Build tools for login automation. Delegates to utils.tools.build_login_tools."""
-    return build_login_tools(driver, creds, _is_logged_in, graph_artefacts_dir)
+    return build_login_tools(_is_logged_in)
 
 
-# A simple global holder for artefacts dir used inside tool closure
-graph_artefacts_dir: List[str] = [""]
+class State(MessagesState):
+    goal: str
+    creds: Dict[str, str]
+    status: str
+    artefacts_dir: str
+    # The one page snapshot kept at full length in messages; older ones are truncated as they are superseded
+    latest_page_snapshot: Optional[ToolMessage]
 
 
-def build_graph(driver: webdriver.Chrome, initial_html_cleaned: str, goal: str, creds: Dict[str, str], artefacts_dir: Path):
-    tools = build_tools(driver, creds)
-    model = ChatOpenAI(model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"), temperature=0).bind_tools(tools)
+_compile_lock = threading.Lock()
 
-    class State(MessagesState):
-        goal: str
-        creds: Dict[str, str]
-        status: str
-        artefacts_dir: str
 
-    def agent_node(state: State) -> Dict[str, Any]:
+def compile_graph(use_async: bool = False):
+    """Return the process-wide compiled login graph, compiling it on first use."""
+    with _compile_lock:
+        return _compile_graph(use_async)
+
+
+@lru_cache(maxsize=None)
+def _compile_graph(use_async: bool):
+    """Compile the login graph once per process (per sync/async flavour).
+
+    Nothing run-specific is baked in: the driver, artefacts dir, credentials and pacer are read
+    from the RunContext in the config the app is invoked with.
+    """
+    tools = build_tools()
+    # Retries are left to Pacer, so a 429 is not also retried (unpaced) inside the openai client
+    model = ChatOpenAI(model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"), temperature=0, max_retries=0).bind_tools(tools)
+    budget = ContextBudget()
+    # Read-only calls run concurrently, clicks/typing one at a time; Selenium calls run in worker threads when driven async
+    post_tools = ToolScheduler(tools)
+
+    def agent_node(state: State, config: RunnableConfig) -> Dict[str, Any]:
         logger.debug("[agent] invoking model with messages")
-        response = model.invoke(state["messages"])
+        messages = budget.fit(state["messages"], state.get("latest_page_snapshot"))
+        response = get_run_context(config).pacer.invoke(model, messages)
         return {"messages": [response]}
 
-    def check_node(state: State) -> Dict[str, Any]:
-        if _is_logged_in(driver):
+    async def aagent_node(state: State, config: RunnableConfig) -> Dict[str, Any]:
+        logger.debug("[agent] invoking model with messages (async)")
+        messages = budget.fit(state["messages"], state.get("latest_page_snapshot"))
+        response = await get_run_context(config).pacer.ainvoke(model, messages)
+        return {"messages": [response]}
+
+    def prune_updates(state: State, result: Dict[str, Any]) -> Dict[str, Any]:
+        messages, latest = prune_page_snapshots(result["messages"], state.get("latest_page_snapshot"))
+        return {"messages": messages, "latest_page_snapshot": latest}
+
+    def tools_node(state: State, config: RunnableConfig) -> Dict[str, Any]:
+        return prune_updates(state, post_tools.invoke(state, config))
+
+    async def atools_node(state: State, config: RunnableConfig) -> Dict[str, Any]:
+        return prune_updates(state, await post_tools.ainvoke(state, config))
+
+    def check_node(state: State, config: RunnableConfig) -> Dict[str, Any]:
+        if _is_logged_in(get_run_context(config).driver):
             return {"status": "logged_in"}
         return {"status": "continue"}
 
+    async def acheck_node(state: State, config: RunnableConfig) -> Dict[str, Any]:
+        return await asyncio.to_thread(check_node, state, config)
+
     def should_continue(state: State):
         last_message = state["messages"][-1]
         # If there are tool calls, route to tools
@@ -102,13 +150,10 @@ def build_graph(driver: webdriver.Chrome, initial_html_cleaned: str, goal: str,
     def route_after_check(state: State):
         return "end" if state.get("status") == "logged_in" else "loop"
 
-
-    post_tools = ToolNode(tools)
-
     graph = StateGraph(State)
-    graph.add_node("agent", agent_node)
-    graph.add_node("tools", post_tools)
-    graph.add_node("check", check_node)
+    graph.add_node("agent", aagent_node if use_async else agent_node)
+    graph.add_node("tools", atools_node if use_async else tools_node)
+    graph.add_node("check", acheck_node if use_async else check_node)
 
     graph.add_edge(START, "agent")
     graph.add_conditional_edges(
@@ -131,7 +176,26 @@ def build_graph(driver: webdriver.Chrome, initial_html_cleaned: str, goal: str,
         },
     )
 
-    app = graph.compile()
+    logger.info(f"Compiled login graph (async={use_async})")
+    return graph.compile()
+
+
+def build_graph(
+    driver: webdriver.Chrome,
+    initial_html_cleaned: str,
+    goal: str,
+    creds: Dict[str, str],
+    artefacts_dir: Path,
+    use_async: bool = False,
+    pacer: Optional[Pacer] = None,
+) -> Tuple[Any, State, RunContext]:
+    """Get the login graph with the initial state and run context for one run.
+
+    With `use_async` the nodes are coroutines and the app must be driven with astream. Invoke the
+    app with `ctx.as_config(...)` so that the nodes and tools can find this run's driver.
+    """
+    app = compile_graph(use_async)
+    ctx = RunContext(driver=driver, artefacts_dir=artefacts_dir, creds=creds, pacer=pacer or Pacer())
     initial_messages: List[AnyMessage] = [
         SystemMessage(content=(
             "You are an automation agent controlling a headless browser via tools. "
@@ -141,13 +205,17 @@ def build_graph(driver: webdriver.Chrome, initial_html_cleaned: str, goal: str,
             "Goal: log in to the target website. Use navigate to go to the login page, "
             "use get_page_html to understand the form, then type_text and click to submit. "
             "Use check_is_logged_in to check progress. Keep iterating until logged in. "
+            "Prefer get_page_html(mode='compact'): it lists only visible and interactive elements with ready-to-use CSS selectors, at a fraction of the size of full HTML. After acting on the page, call get_page_changes to see only what changed. "
+            "Start with get_cached_selectors: if the fields you need are cached, pass their role (e.g. email_field, password_field, login_button) with an empty selector to type_text/click. When you find a selector yourself, pass a role with it so it is cached for next time ([data-pllm-id] selectors only last for the current page load and are never cached, so prefer a natural one such as #id or [name=...]). "
+            "When you know several steps at once (e.g. type email, type password, click login, wait), do them in a single run_actions call. "
+            "To wait for the page, prefer wait_for (e.g. condition='dom_idle' after navigating or submitting) over sleep. "
             "Policy: Never include raw secrets in tool arguments. Use these placeholders: <EMAIL> for email fields, <PASSWORD> for password fields. "
             "Placeholders will be substituted with secure values at execution time. "
             "Only use tools; do not fabricate steps."
         )),
         HumanMessage(content=(
             f"Instructions: {goal}"
-            f"Initial HTML (cleaned): {initial_html_cleaned}"
+            f"{INITIAL_HTML_MARKER}{initial_html_cleaned}"
         )),
     ]
 
@@ -157,84 +225,33 @@ def build_graph(driver: webdriver.Chrome, initial_html_cleaned: str, goal: str,
         "creds": creds,
         "status": "start",
         "artefacts_dir": str(artefacts_dir),
+        "latest_page_snapshot": None,
     }
 
-    return app, state
+    return app, state, ctx
 
 
-def message_to_dict(msg: BaseMessage) -> dict:
-    """Convert a LangChain message to a JSON-serializable dict."""
-    result = {
-        "type": msg.__class__.__name__,
-        "content": msg.content,
-    }
+def login_profile_name(profile: Optional[str] = None) -> str:
+    """The login profile a run uses: the given one, else LOGIN_PROFILE, else "default"."""
+    return profile or os.getenv("LOGIN_PROFILE", "default")
 
-    # Add tool calls if present
-    if hasattr(msg, "tool_calls") and msg.tool_calls:
-        result["tool_calls"] = [
-            {
-                "name": tc.get("name"),
-                "args": tc.get("args"),
-                "id": tc.get("id"),
-            }
-            for tc in msg.tool_calls
-        ]
-
-    # Add tool call ID if this is a tool response
-    if hasattr(msg, "tool_call_id"):
-        result["tool_call_id"] = msg.tool_call_id
-
-    return result
-
-
-def run_and_save_execution_trace(stream, artefacts_dir: Path) -> Path:
-    """Save the full execution trace to JSON."""
-    trace = {
-        "run_id": str(uuid.uuid4()),
-        "run_type": artefacts_dir.name,
-        "timestamp": datetime.utcnow().isoformat(),
-        "steps": []
-    }
 
-    final_state = None
-    for step in stream:
-        final_state = step
-
-        # Convert each step to a serializable format
-        step_data = {}
-        for node_name, node_state in step.items():
-            step_data[node_name] = {
-                "status": node_state.get("status"),
-                "goal": node_state.get("goal"),
-                "messages": [message_to_dict(msg) for msg in node_state.get("messages", [])],
-                "artefacts_dir": node_state.get("artefacts_dir"),
-            }
-
-        trace["steps"].append(step_data)
-        logger.debug(f"Captured step {len(trace['steps'])}: {list(step.keys())}")
-
-    # Add final state summary
-    if final_state:
-        # Get the final status from the last state in the stream
-        for node_state in final_state.values():
-            if "status" in node_state:
-                trace["final_status"] = node_state.get("status")
-                break
-        trace["total_steps"] = len(trace["steps"])
-
-    # Save to JSON
-    trace_file = artefacts_dir / "execution_trace.json"
-    with trace_file.open("w", encoding="utf-8") as f:
-        json.dump(trace, f, indent=2, ensure_ascii=False)
-
-    logger.info(f"Execution trace saved to: {trace_file}")
-    return trace_file
-
-
-def run_login(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: str = None) -> Tuple[bool, Path]:
+def _prepare_login(
+    driver: webdriver.Chrome,
+    profile: Optional[str],
+    run_ts: Optional[str],
+    reuse_session: bool,
+    artefacts_group: Optional[str],
+    use_async: bool = False,
+) -> Tuple[Path, str, Optional[Tuple[Any, State, RunContext]]]:
+    """Load config, open the site and build the login graph.
+
+    Returns (artefacts_dir, login_profile, (app, state, ctx)); the graph is None when a saved
+    session was restored and is already logged in.
+    """
     load_dotenv(dotenv_path=Path(".env"), override=False)
 
-    login_profile = profile or os.getenv("LOGIN_PROFILE", "default")
+    login_profile = login_profile_name(profile)
     logger.info(f"Selected login profile: {login_profile}")
     secrets_path = Path("config/secret/logins.yaml.env")
     state_path = Path("config/state.yaml")
@@ -246,29 +263,48 @@ def run_login(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: s
     if not creds:
         raise RuntimeError(f"No credentials found for profile '{login_profile}' in {secrets_path}")
 
-    artefacts_dir = ensure_artefacts_dir(subfolder="run_login", ts=run_ts)
-    graph_artefacts_dir[0] = str(artefacts_dir)
+    artefacts_dir = ensure_artefacts_dir(subfolder="run_login", ts=run_ts, group=artefacts_group)
     logger.info(f"artefacts directory: {artefacts_dir}")
 
     driver.set_window_size(1280, 1200)
     logger.info(f"Navigating to base URL: {BASE_URL}")
     driver.get(BASE_URL)
 
-    initial_html = driver.page_source
-    initial_html_cleaned = re.sub(r"<script\b[^>]*>[\s\S]*?<\/script>", "", initial_html, flags=re.IGNORECASE)
+    # Fast path: restore a saved session and skip the agentic login if it is still valid
+    if reuse_session and restore_session(driver, login_profile, BASE_URL):
+        # readyState alone is too early on the SPA: a client-side redirect to the login form
+        # (an expired session) has not rendered yet, so let the page settle before checking
+        wait_for_condition(driver, "dom_idle", timeout=SESSION_SETTLE_TIMEOUT)
+        if _is_logged_in(driver):
+            logger.info(f"Restored saved session for profile '{login_profile}' is still logged in, skipping login graph")
+            save_html(driver, artefacts_dir, "post_login")
+            save_screenshot(driver, artefacts_dir, "post_login")
+            return artefacts_dir, login_profile, None
+        logger.info("Restored session is not logged in, falling back to login graph")
+        clear_session(driver, login_profile)
+        driver.get(BASE_URL)
+
+    initial_html_cleaned = sanitize_html(driver.page_source)
 
     goal_text = str(run_state.get("run_login", {}).get("instructions", "Log in successfully and reach the main app."))
     logger.info(f"Instructions: {goal_text}")
-    app, state = build_graph(driver, initial_html_cleaned, goal_text, creds, artefacts_dir)
-    logger.info("Graph compiled. Beginning execution loop...")
+    app, state, ctx = build_graph(driver, initial_html_cleaned, goal_text, creds, artefacts_dir, use_async=use_async)
+    ctx.replay_key = page_fingerprint(driver)
+    logger.info("Graph ready. Beginning execution loop...")
+    return artefacts_dir, login_profile, (app, state, ctx)
+
+
+def _replay_login(ctx: RunContext) -> bool:
+    """Replay the recorded login for this page, if any; on failure reload the login page for the agent."""
+    ok, _ = try_replay("run_login", ctx.replay_key, build_tools(), ctx, lambda results: (
+        (True, "logged in") if _is_logged_in(ctx.driver) else (False, "not logged in after replay")
+    ))
+    if not ok and ctx.driver.current_url != BASE_URL:
+        ctx.driver.get(BASE_URL)
+    return ok
 
-    # Prime the agent with a suggested plan and initial actions
-    # It can choose to call navigate, get_page_html, type_text, click, etc.
-    _ = run_and_save_execution_trace(
-        app.stream(state, config={"recursion_limit": 25}),
-        artefacts_dir
-    )
 
+def _finish_login(driver: webdriver.Chrome, artefacts_dir: Path, login_profile: str, reuse_session: bool) -> Tuple[bool, Path]:
     success = _is_logged_in(driver)
     logger.info(f"Login success status after graph run: {success}")
 
@@ -277,20 +313,80 @@ def run_login(driver: webdriver.Chrome, profile: Optional[str] = None, run_ts: s
         logger.info("Saving post-login HTML and screenshot...")
         save_html(driver, artefacts_dir, "post_login")
         save_screenshot(driver, artefacts_dir, "post_login")
+        if reuse_session:
+            save_session(driver, login_profile)
+
+    return success, artefacts_dir
+
 
+def run_login(
+    driver: webdriver.Chrome,
+    profile: Optional[str] = None,
+    run_ts: str = None,
+    reuse_session: bool = True,
+    artefacts_group: Optional[str] = None,
+) -> Tuple[bool, Path]:
+    artefacts_dir, login_profile, graph = _prepare_login(driver, profile, run_ts, reuse_session, artefacts_group)
+    if graph is None:
+        return True, artefacts_dir
+    app, state, ctx = graph
+    if _replay_login(ctx):
+        return _finish_login(driver, artefacts_dir, login_profile, reuse_session)
+
+    # Prime the agent with a suggested plan and initial actions
+    # It can choose to call navigate, get_page_html, type_text, click, etc.
+    trace = run_and_save_execution_trace(
+        app.stream(state, config=ctx.as_config(recursion_limit=25)),
+        artefacts_dir
+    )
+    ctx.pacer.log_summary("run_login")
+
+    success, artefacts_dir = _finish_login(driver, artefacts_dir, login_profile, reuse_session)
+    if success:
+        record_replay("run_login", ctx.replay_key, trace["trace_file"], ctx.creds)
+    return success, artefacts_dir
+
+
+async def arun_login(
+    driver: webdriver.Chrome,
+    profile: Optional[str] = None,
+    run_ts: str = None,
+    reuse_session: bool = True,
+    artefacts_group: Optional[str] = None,
+) -> Tuple[bool, Path]:
+    """Async variant of run_login: the graph runs with astream and Selenium calls run in worker threads."""
+    artefacts_dir, login_profile, graph = await asyncio.to_thread(
+        _prepare_login, driver, profile, run_ts, reuse_session, artefacts_group, True,
+    )
+    if graph is None:
+        return True, artefacts_dir
+    app, state, ctx = graph
+    if await asyncio.to_thread(_replay_login, ctx):
+        return await asyncio.to_thread(_finish_login, driver, artefacts_dir, login_profile, reuse_session)
+
+    trace = await arun_and_save_execution_trace(
+        app.astream(state, config=ctx.as_config(recursion_limit=25)),
+        artefacts_dir
+    )
+    ctx.pacer.log_summary("run_login")
+
+    success, artefacts_dir = await asyncio.to_thread(_finish_login, driver, artefacts_dir, login_profile, reuse_session)
+    if success:
+        await asyncio.to_thread(record_replay, "run_login", ctx.replay_key, trace["trace_file"], ctx.creds)
     return success, artefacts_dir
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run QA test for the login interface")
     parser.add_argument("--headless", action="store_true", help="Run in headless mode")
+    parser.add_argument("--no-session", action="store_true", help="Ignore saved sessions and always run the login graph")
     args = parser.parse_args()
     logger.info(f"Running in headless mode: {args.headless}")
 
     run_ts = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
     with get_driver(headless=args.headless) as driver:
         logger.info("Invoking run_login()...")
-        ok, out = run_login(driver, run_ts=run_ts)
+        ok, out = run_login(driver, run_ts=run_ts, reuse_session=not args.no_session)
         if not ok:
             copy_trace_to_error_folder(out)
 
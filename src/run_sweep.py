@@ -0,0 +1,175 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .run_chats import arun_login_and_chats, run_login_and_chats
+from .utils.files import read_yaml
+from .utils.selenium import DriverPool
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(
+    level=getattr(logging, LOG_LEVEL, logging.INFO),
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+)
+logger = logging.getLogger("sweep_runner")
+
+
+# In process mode, each worker process owns one long-lived driver pool, created by the executor's initializer
+_worker_pool: Optional[DriverPool] = None
+
+
+def _init_worker(headless: bool, max_uses: int) -> None:
+    global _worker_pool
+    _worker_pool = DriverPool(size=1, max_uses=max_uses, headless=headless)
+    # atexit does not fire in pool workers, but multiprocessing finalizers do
+    Finalize(_worker_pool, _worker_pool.close, exitpriority=10)
+
+
+def _check_profile(profile: str, run_ts: str, reuse_session: bool, pool: Optional[DriverPool] = None) -> Dict[str, Any]:
+    """Run login -> chats for a single profile on a driver leased from `pool` (default: this worker's pool)."""
+    pool = pool or _worker_pool
+    t0 = time.monotonic()
+    result: Dict[str, Any] = {"profile": profile, "login_ok": False, "chats_ok": False, "artefacts_dir": None, "error": None}
+    try:
+        with pool.lease() as driver:
+            login_ok, chats_ok, out = run_login_and_chats(
+                driver, profile=profile, run_ts=run_ts, reuse_session=reuse_session, artefacts_group=profile,
+            )
+        result.update(login_ok=login_ok, chats_ok=chats_ok, artefacts_dir=str(out))
+    except Exception as e:
+        logger.error(f"[{profile}] check failed with an unexpected error: {e}", exc_info=True)
+        result["error"] = str(e)
+    result["seconds"] = round(time.monotonic() - t0, 1)
+    return result
+
+
+async def _acheck_profile(profile: str, run_ts: str, reuse_session: bool, pool: DriverPool, limit: asyncio.Semaphore) -> Dict[str, Any]:
+    """Async variant of _check_profile; `limit` bounds how many sessions are driven at once."""
+    async with limit:
+        t0 = time.monotonic()
+        result: Dict[str, Any] = {"profile": profile, "login_ok": False, "chats_ok": False, "artefacts_dir": None, "error": None}
+        try:
+            async with pool.alease() as driver:
+                login_ok, chats_ok, out = await arun_login_and_chats(
+                    driver, profile=profile, run_ts=run_ts, reuse_session=reuse_session, artefacts_group=profile,
+                )
+            result.update(login_ok=login_ok, chats_ok=chats_ok, artefacts_dir=str(out))
+        except Exception as e:
+            logger.error(f"[{profile}] check failed with an unexpected error: {e}", exc_info=True)
+            result["error"] = str(e)
+        result["seconds"] = round(time.monotonic() - t0, 1)
+        return result
+
+
+async def _arun_sweep(profiles: List[str], workers: int, headless: bool, reuse_session: bool, max_uses: int, run_ts: str) -> List[Dict[str, Any]]:
+    # Selenium calls and sync tools run in the default executor, so size it for the number of sessions
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(4, 2 * workers)))
+    limit = asyncio.Semaphore(workers)
+    with DriverPool(size=workers, max_uses=max_uses, headless=headless) as pool:
+        return await asyncio.gather(*[_acheck_profile(profile, run_ts, reuse_session, pool, limit) for profile in profiles])
+
+
+def _log_result(result: Dict[str, Any]) -> None:
+    logger.info(
+        f"[{result['profile']}] login_success={result['login_ok']} chats_success={result['chats_ok']} "
+        f"seconds={result['seconds']} artefacts_dir={result['artefacts_dir']}"
+    )
+
+
+def run_sweep(
+    profiles: List[str],
+    workers: int,
+    headless: bool = False,
+    reuse_session: bool = True,
+    max_uses: int = 20,
+    run_ts: Optional[str] = None,
+    executor_type: str = "thread",
+) -> List[Dict[str, Any]]:
+    """Fan the login -> chats check for each profile out over `workers` browsers.
+
+    With `executor_type="thread"` the workers share one DriverPool in this process; with "process"
+    each worker process owns its own browser; with "async" a single event loop drives up to
+    `workers` sessions at once through the async graph variants. All profiles share the same run timestamp; artefacts
+    are kept apart under artefacts/<ts>/<profile>/.
+    """
+    run_ts = run_ts or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    workers = max(1, min(workers, len(profiles)))
+    logger.info(f"Sweeping {len(profiles)} profile(s) with {workers} {executor_type} worker(s), run_ts={run_ts}")
+
+    t0 = time.monotonic()
+    results = []
+    pool = None
+    if executor_type == "async":
+        results = asyncio.run(_arun_sweep(profiles, workers, headless, reuse_session, max_uses, run_ts))
+        for result in results:
+            _log_result(result)
+        executor = None
+    elif executor_type == "thread":
+        pool = DriverPool(size=workers, max_uses=max_uses, headless=headless)
+        executor = ThreadPoolExecutor(max_workers=workers)
+    elif executor_type == "process":
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(headless, max_uses))
+    else:
+        raise ValueError(f"Unknown executor type: {executor_type}")
+
+    if executor:
+        with executor:
+            futures = {executor.submit(_check_profile, profile, run_ts, reuse_session, pool): profile for profile in profiles}
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                _log_result(result)
+    if pool:
+        pool.close()
+
+    failed = [r["profile"] for r in results if not (r["login_ok"] and r["chats_ok"])]
+    logger.info(f"Sweep finished in {time.monotonic() - t0:.1f}s: {len(results) - len(failed)}/{len(results)} profile(s) healthy")
+    if failed:
+        logger.warning(f"Unhealthy profile(s): {', '.join(sorted(failed))}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the login + chat QA check for many login profiles concurrently")
+    parser.add_argument("--headless", action="store_true", help="Run in headless mode")
+    parser.add_argument("--profiles", nargs="*", help="Profiles to check (default: every profile in logins.yaml.env)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SWEEP_WORKERS", "2")), help="Number of profiles (and browsers) to run at once")
+    parser.add_argument("--max-uses", type=int, default=int(os.getenv("DRIVER_MAX_USES", "20")), help="Recycle a browser after this many checks")
+    parser.add_argument("--no-session", action="store_true", help="Ignore saved sessions and always run the login graph")
+    parser.add_argument("--executor", choices=["thread", "process", "async"], default="thread", help="Run profiles in threads (shared driver pool), separate processes, or asyncio tasks")
+    args = parser.parse_args()
+
+    profiles = args.profiles or list(read_yaml(Path("config/secret/logins.yaml.env")).keys())
+    if not profiles:
+        raise SystemExit("No login profiles found")
+
+    run_sweep(
+        profiles,
+        workers=args.workers,
+        headless=args.headless,
+        reuse_session=not args.no_session,
+        max_uses=args.max_uses,
+        executor_type=args.executor,
+    )
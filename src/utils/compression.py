@@ -0,0 +1,175 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Optional per-file compression of text artefacts (HTML captures and execution traces).
+
+ARTEFACT_COMPRESSION selects how new artefacts are written: "none" (default), "gzip" (.gz) or
+"zstd" (.zst, needs the `zstandard` package; falls back to gzip without it). Readers pick the
+codec from the file suffix, so folders written under different settings stay readable.
+
+Measure the savings on existing captures with:
+
+    python -m src.utils.compression --bench artefacts/
+"""
+
+import argparse
+import gzip
+import io
+import logging
+import os
+import time
+from pathlib import Path
+from typing import IO, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+ARTEFACT_COMPRESSION = os.getenv("ARTEFACT_COMPRESSION", "none").lower()
+GZIP_LEVEL = int(os.getenv("ARTEFACT_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("ARTEFACT_ZSTD_LEVEL", "10"))
+
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def _zstandard() -> Optional[object]:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def codec(compression: Optional[str] = None) -> str:
+    """The codec new artefacts are written with: "none", "gzip" or "zstd"."""
+    compression = (compression or ARTEFACT_COMPRESSION).lower()
+    if compression in ("", "0", "false", "no", "off"):
+        return "none"
+    if compression == "zstd" and _zstandard() is None:
+        logger.warning("[compression] zstandard not installed, writing gzip instead")
+        return "gzip"
+    if compression not in ("none", *SUFFIXES):
+        logger.warning(f"[compression] unknown ARTEFACT_COMPRESSION={compression!r}, writing uncompressed")
+        return "none"
+    return compression
+
+
+def compressed_name(name: str, compression: Optional[str] = None) -> str:
+    """`name` with the suffix of the codec in use, e.g. initial.html -> initial.html.gz."""
+    return name + SUFFIXES.get(codec(compression), "")
+
+
+def codec_of(path: Path) -> str:
+    for name, suffix in SUFFIXES.items():
+        if Path(path).suffix == suffix:
+            return name
+    return "none"
+
+
+def base_suffix(path: Path) -> str:
+    """The suffix of the underlying format, ignoring any compression suffix (.jsonl.gz -> .jsonl)."""
+    path = Path(path)
+    return Path(path.stem).suffix if codec_of(path) != "none" else path.suffix
+
+
+def find_artefact(folder: Path, name: str) -> Optional[Path]:
+    """`folder/name` as written under any compression setting, if it exists."""
+    for suffix in ("", *SUFFIXES.values()):
+        fp = Path(folder) / (name + suffix)
+        if fp.exists():
+            return fp
+    return None
+
+
+def open_text(path: Path, mode: str = "r") -> IO[str]:
+    """Open an artefact for text reading ("r") or writing ("w"), (de)compressing by its suffix.
+
+    Written streams support flush(), which makes everything written so far readable (a sync flush
+    for gzip, a block flush for zstd), so a streamed trace survives a crash of the writer.
+    """
+    path = Path(path)
+    compression = codec_of(path)
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=GZIP_LEVEL)
+    if compression == "zstd":
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is needed to open {path}")
+        raw = path.open(mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8", write_through=True)
+    return path.open(mode, encoding="utf-8")
+
+
+def write_text(path: Path, text: str) -> Path:
+    with open_text(path, "w") as f:
+        f.write(text)
+    return Path(path)
+
+
+def read_text(path: Path) -> str:
+    with open_text(path, "r") as f:
+        return f.read()
+
+
+def compress_bytes(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return data
+
+
+def bench(root: Path) -> None:
+    # Already-compressed artefacts are measured from their decompressed contents
+    files = sorted(fp for fp in root.rglob("*") if fp.is_file() and base_suffix(fp) in (".html", ".json", ".jsonl"))
+    if not files:
+        raise SystemExit(f"No .html/.json/.jsonl artefacts found under {root}")
+
+    codecs = ["gzip"] + (["zstd"] if _zstandard() is not None else [])
+    totals: Dict[str, float] = {"raw": 0}
+    for name in codecs:
+        totals[name] = totals[f"{name}_s"] = 0
+
+    print(f"{'file':60} {'raw KB':>9} " + " ".join(f"{name + ' KB':>9} {name + ' ms':>9}" for name in codecs))
+    for fp in files:
+        data = read_text(fp).encode("utf-8")
+        totals["raw"] += len(data)
+        row = f"{str(fp)[-60:]:60} {len(data) / 1024:9.1f} "
+        for name in codecs:
+            t0 = time.perf_counter()
+            size = len(compress_bytes(data, name))
+            elapsed = time.perf_counter() - t0
+            totals[name] += size
+            totals[f"{name}_s"] += elapsed
+            row += f"{size / 1024:9.1f} {elapsed * 1000:9.1f} "
+        print(row)
+
+    print(f"\n{len(files)} file(s), {totals['raw'] / 1024:.0f} KB uncompressed")
+    for name in codecs:
+        ratio = totals["raw"] / totals[name] if totals[name] else float("inf")
+        level = GZIP_LEVEL if name == "gzip" else ZSTD_LEVEL
+        print(
+            f"  {name} (level {level}): {totals[name] / 1024:.0f} KB on disk / uploaded ({ratio:.1f}x smaller, "
+            f"{(totals['raw'] - totals[name]) / 1024:.0f} KB saved), {totals[f'{name}_s'] * 1000:.0f} ms to compress"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the disk and upload savings of compressing artefacts")
+    parser.add_argument("--bench", type=Path, required=True, help="Folder to search recursively for .html/.json/.jsonl artefacts")
+    args = parser.parse_args()
+    bench(args.bench)
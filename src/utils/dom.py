@@ -0,0 +1,159 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""JavaScript snippets injected into the page by the browser tools."""
+
+# Selector used by wait_for(condition="spinner_gone") when the agent does not supply one
+DEFAULT_SPINNER_SELECTOR = (
+    "[class*='spinner'], [class*='loading'], [class*='generating'], [aria-busy='true'], [role='progressbar']"
+)
+
+# execute_async_script(quiet_ms, timeout_ms): resolves true once no DOM mutation has been
+# observed for quiet_ms, or false when timeout_ms elapses first
+DOM_IDLE_JS = """
+const quietMs = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+const start = performance.now();
+let last = start;
+const observer = new MutationObserver(() => { last = performance.now(); });
+observer.observe(document.documentElement, {subtree: true, childList: true, characterData: true, attributes: true});
+const tick = () => {
+    const now = performance.now();
+    if (now - last >= quietMs) { observer.disconnect(); done(true); }
+    else if (now - start >= timeoutMs) { observer.disconnect(); done(false); }
+    else { setTimeout(tick, 50); }
+};
+setTimeout(tick, 50);
+"""
+
+# execute_async_script(panel_selector, spinner_selector, stable_ms, timeout_ms): tracks the text
+# length of every element matching panel_selector, and resolves once every panel that changed has
+# been quiet for stable_ms and no spinner is visible (or when timeout_ms elapses). Times are in ms,
+# relative to the moment the script was injected.
+RESPONSE_WATCH_JS = """
+const panelSel = arguments[0], spinnerSel = arguments[1], stableMs = arguments[2], timeoutMs = arguments[3], tailChars = arguments[4];
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+const stats = [];
+let sampledOnce = false;
+const isVisible = (el) => el.getClientRects().length > 0;
+const labelOf = (el) => {
+    const heading = el.querySelector("h1, h2, h3, h4, header, [class*='model']");
+    return (el.getAttribute("aria-label") || el.dataset.model || (heading ? heading.innerText : "") || "").trim().slice(0, 60);
+};
+const sample = () => {
+    const now = performance.now() - start;
+    document.querySelectorAll(panelSel).forEach((el, i) => {
+        const length = (el.textContent || "").length;
+        let s = stats[i];
+        if (!s) {
+            // Panels that appear after injection (e.g. a new turn's responses) start from empty
+            // preexisting: on the page before injection, e.g. an earlier turn's responses
+            s = stats[i] = {index: i, label: labelOf(el), initial_length: sampledOnce ? 0 : length, length: sampledOnce ? 0 : length,
+                            preexisting: !sampledOnce, first_change_ms: null, last_change_ms: null};
+        }
+        if (length !== s.length) {
+            s.length = length;
+            if (s.first_change_ms === null) { s.first_change_ms = now; }
+            s.last_change_ms = now;
+            if (!s.label) { s.label = labelOf(el); }
+        }
+    });
+    sampledOnce = true;
+};
+const spinnerVisible = () => !!spinnerSel && Array.from(document.querySelectorAll(spinnerSel)).some(isVisible);
+const observer = new MutationObserver(sample);
+observer.observe(document.body, {subtree: true, childList: true, characterData: true});
+sample();
+const tick = () => {
+    sample();
+    const now = performance.now() - start;
+    const changed = stats.filter((s) => s.first_change_ms !== null);
+    const settled = changed.length > 0 && !spinnerVisible() && changed.every((s) => now - s.last_change_ms >= stableMs);
+    if (settled || now >= timeoutMs) {
+        observer.disconnect();
+        // The end of each panel's final text, to judge what was actually answered
+        document.querySelectorAll(panelSel).forEach((el, i) => {
+            if (stats[i]) { stats[i].tail = (el.innerText || el.textContent || "").replace(/\s+/g, " ").trim().slice(-tailChars); }
+        });
+        done({timed_out: !settled, elapsed_ms: Math.round(now), spinner_visible: spinnerVisible(), panels: stats});
+    } else {
+        setTimeout(tick, 100);
+    }
+};
+setTimeout(tick, 100);
+"""
+
+# execute_script(max_text): returns {page_id, elements} where elements are the visible interactive
+# elements and text blocks of the page, in document order. Each element gets a short id in a
+# data-pllm-id attribute that stays stable for the lifetime of the page, and a ready-to-use CSS
+# selector (a natural one such as #id or [name=...] when it is unique, otherwise the data-pllm-id
+# attribute). page_id changes on every page load, since the short ids start again from e1.
+COMPACT_DOM_JS = """
+const maxText = arguments[0];
+const INTERACTIVE = "a[href], button, input:not([type='hidden']), textarea, select, summary, [contenteditable='true'], "
+    + "[role='button'], [role='link'], [role='textbox'], [role='checkbox'], [role='radio'], [role='tab'], [role='menuitem'], "
+    + "[role='option'], [role='combobox'], [role='switch'], [tabindex]:not([tabindex='-1'])";
+const TEXT_BLOCK = "h1, h2, h3, h4, h5, h6, p, li, td, th, pre, code, label, [role='alert'], [role='status'], [role='heading']";
+if (window.__pllmNextId === undefined) {
+    window.__pllmNextId = 1;
+    window.__pllmPageId = Math.random().toString(36).slice(2);
+}
+const clean = (t) => (t || "").replace(/\\s+/g, " ").trim();
+const visible = (el) => {
+    if (!el.getClientRects().length) { return false; }
+    const style = window.getComputedStyle(el);
+    return style.visibility !== "hidden" && style.display !== "none" && style.opacity !== "0";
+};
+const unique = (sel) => { try { return document.querySelectorAll(sel).length === 1; } catch (e) { return false; } };
+const attrSel = (el, name) => {
+    const v = el.getAttribute(name);
+    return v ? `${el.tagName.toLowerCase()}[${name}="${v.replace(/"/g, '\\\\"')}"]` : null;
+};
+const selectorFor = (el, pid) => {
+    const candidates = [el.id ? "#" + CSS.escape(el.id) : null, attrSel(el, "name"), attrSel(el, "aria-label"),
+                        attrSel(el, "placeholder"), attrSel(el, "data-testid")];
+    for (const c of candidates) { if (c && unique(c)) { return c; } }
+    return `[data-pllm-id="${pid}"]`;
+};
+const ownText = (el) => clean(Array.from(el.childNodes).filter((n) => n.nodeType === Node.TEXT_NODE).map((n) => n.textContent).join(" "));
+const out = [];
+const covered = new Set();
+for (const el of document.body.querySelectorAll("*")) {
+    // Text inside an emitted element is already summarised by its text, but interactive elements
+    // inside it (<label>Email <input></label>, <li><a href>, <td><button>) still need their own line
+    const inCovered = covered.has(el.parentElement);
+    const interactive = el.matches(INTERACTIVE);
+    if (inCovered && !interactive) { covered.add(el); continue; }
+    const text = interactive ? clean(el.innerText || el.value || "") : (el.matches(TEXT_BLOCK) ? clean(el.innerText) : ownText(el));
+    if ((!interactive && !text) || !visible(el)) {
+        if (inCovered) { covered.add(el); }
+        continue;
+    }
+    covered.add(el);
+    let pid = el.getAttribute("data-pllm-id");
+    if (!pid) { pid = "e" + window.__pllmNextId++; el.setAttribute("data-pllm-id", pid); }
+    out.push({
+        id: pid,
+        tag: el.tagName.toLowerCase(),
+        role: el.getAttribute("role") || "",
+        type: el.getAttribute("type") || "",
+        label: clean(el.getAttribute("aria-label") || el.getAttribute("placeholder") || el.getAttribute("title") || el.getAttribute("alt") || ""),
+        text: text.slice(0, maxText),
+        interactive: interactive,
+        disabled: !!(el.disabled || el.getAttribute("aria-disabled") === "true"),
+        selector: selectorFor(el, pid),
+    });
+}
+return {page_id: window.__pllmPageId, elements: out};
+"""
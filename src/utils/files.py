@@ -23,6 +23,10 @@ from typing import Any, Dict, List, Optional
 import yaml
 from selenium import webdriver
 
+from .compression import compressed_name, open_text, write_text
+from .runtime import page_source
+from .trace import LEGACY_TRACE_FILE, read_trace, trace_file_in
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,18 +37,22 @@ def read_yaml(path: Path) -> Dict[str, Any]:
         return yaml.safe_load(f) or {}
 
 
-def ensure_artefacts_dir(subfolder: str, ts: Optional[str] = None) -> Path:
+def ensure_artefacts_dir(subfolder: str, ts: Optional[str] = None, group: Optional[str] = None) -> Path:
     ts = ts or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
-    out_dir = Path("artefacts") / ts / subfolder
+    out_dir = Path("artefacts") / ts
+    if group:
+        # e.g. one folder per login profile when several profiles run at the same timestamp
+        out_dir = out_dir / group
+    out_dir = out_dir / subfolder
     out_dir.mkdir(parents=True, exist_ok=True)
     return out_dir
 
 
 def save_html(driver: webdriver.Chrome, out_dir: Path, name: str) -> Path:
-    html = driver.page_source
-    fp = out_dir / f"{name}.html"
-    fp.write_text(html, encoding="utf-8")
-    return fp
+    html = page_source(driver)
+    # name.html, or name.html.gz/.zst under ARTEFACT_COMPRESSION
+    fp = out_dir / compressed_name(f"{name}.html")
+    return write_text(fp, html)
 
 
 def save_screenshot(driver: webdriver.Chrome, out_dir: Path, name: str) -> Path:
@@ -57,29 +65,33 @@ def copy_trace_to_error_folder(artefacts_dir: Path) -> Optional[Path]:
     """
     Copy execution trace and any PNG files to the error folder in a subdirectory named by run_id.
 
+    The trace is written there as a single execution_trace.json document, reconstructed from
+    the streamed trace, for the monitor to upload. Large message bodies stay deduplicated in its
+    top-level "blobs" map (read_trace resolves them), and the file is compressed under
+    ARTEFACT_COMPRESSION (execution_trace.json.gz/.zst).
+
     Args:
         artefacts_dir: Path to the artefacts directory containing the execution trace
 
     Returns:
         Path to the copied error trace file, or None if the trace file doesn't exist
     """
-    trace_file = artefacts_dir / "execution_trace.json"
-    if not trace_file.exists():
-        logger.warning(f"Execution trace not found at {trace_file}")
+    trace_file = trace_file_in(artefacts_dir)
+    if trace_file is None:
+        logger.warning(f"Execution trace not found in {artefacts_dir}")
         return None
 
     # Use the full run_id from the trace file for the folder name
-    with trace_file.open("r", encoding="utf-8") as f:
-        trace_data = json.load(f)
-        run_id = trace_data.get("run_id", str(uuid.uuid4()))
+    trace_data = read_trace(trace_file, resolve_blobs=False)
+    run_id = trace_data.get("run_id", str(uuid.uuid4()))
 
     # Create error subdirectory with the full run_id
     error_run_dir = Path("artefacts/error") / run_id
     error_run_dir.mkdir(parents=True, exist_ok=True)
 
-    # Copy trace file with original filename
-    error_trace_file = error_run_dir / "execution_trace.json"
-    shutil.copy2(trace_file, error_trace_file)
+    error_trace_file = error_run_dir / compressed_name(LEGACY_TRACE_FILE)
+    with open_text(error_trace_file, "w") as f:
+        json.dump(trace_data, f, indent=2, ensure_ascii=False)
     logger.info(f"Copied execution trace to error folder: {error_trace_file}")
 
     # Copy all PNG files from the artefacts directory
@@ -90,4 +102,3 @@ def copy_trace_to_error_folder(artefacts_dir: Path) -> Optional[Path]:
         logger.info(f"Copied screenshot to error folder: {dest_file}")
 
     return error_trace_file
-
@@ -0,0 +1,237 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+
+logger = logging.getLogger(__name__)
+
+# Tools whose whole output is a snapshot of the page, superseded by the next one
+PAGE_SNAPSHOT_TOOLS = {"get_page_html"}
+# Tools whose output only records where captures (HTML/screenshots) were saved
+CAPTURE_TOOLS = {"save_chat_capture", "post_login_capture"}
+# Precedes the page HTML in a graph's first HumanMessage; everything after it is that initial page
+INITIAL_HTML_MARKER = "Initial HTML (cleaned): "
+# Max prompt size (in tokens) per model call; above it older tool outputs are summarised for that call
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "60000"))
+
+
+def contains_html(content: str) -> bool:
+    """Check if content contains substantial HTML (indicating page source dumps)."""
+    if not isinstance(content, str):
+        return False
+    # Look for common HTML patterns that indicate page source
+    html_indicators = ['<!DOCTYPE', '<html', '<head>', '<body>', '<div', '<script', '<span']
+    return any(indicator in content for indicator in html_indicators)
+
+
+def is_page_snapshot(msg: BaseMessage) -> bool:
+    return isinstance(msg, ToolMessage) and (msg.name in PAGE_SNAPSHOT_TOOLS or contains_html(str(msg.content)))
+
+
+def truncated_copy(msg: ToolMessage, keep: int = 100) -> ToolMessage:
+    """Copy of `msg` (same id, so it replaces the original in state) keeping only the first/last `keep` characters."""
+    content = str(msg.content)
+    if len(content) <= 3 * keep:
+        return msg
+    truncated = content[:keep] + f"\n... [truncated {len(content) - 2 * keep} characters] ...\n" + content[-keep:]
+    return msg.model_copy(update={"content": truncated})
+
+
+def prune_page_snapshots(
+    new_messages: Sequence[BaseMessage],
+    latest: Optional[ToolMessage],
+) -> Tuple[List[BaseMessage], Optional[ToolMessage]]:
+    """Keep only the latest page snapshot at full length, incrementally.
+
+    Called with the messages a tools step is about to add to state and the snapshot currently kept
+    at full length. Only the new messages are inspected: when they contain a newer snapshot, the
+    previous one is truncated by re-adding it under its own id, which `add_messages` applies as an
+    in-place replacement. Returns (messages to add, latest full-length snapshot).
+    """
+    to_add: List[BaseMessage] = []
+    superseded: List[ToolMessage] = []
+    for msg in new_messages:
+        if is_page_snapshot(msg):
+            # Ids are normally assigned by add_messages; assign them now so the message can be replaced later
+            if msg.id is None:
+                msg.id = str(uuid.uuid4())
+            if latest is not None:
+                superseded.append(latest)
+            latest = msg
+        to_add.append(msg)
+
+    truncated = [copy for msg in superseded if (copy := truncated_copy(msg)) is not msg]
+    # Snapshots superseded within this same step have not reached state yet, so replace them in place
+    replacements = {msg.id: msg for msg in truncated}
+    to_add = [replacements.pop(msg.id, msg) for msg in to_add]
+    to_add = list(replacements.values()) + to_add
+    if truncated:
+        logger.info(f"[history] truncated {len(truncated)} superseded page snapshot(s), kept latest at full length")
+    return to_add, latest
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[Any]:
+    """The tiktoken encoding for OPENAI_MODEL, or None to fall back to ~4 characters per token."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("[context] tiktoken not installed, approximating tokens as characters / 4")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(os.getenv("OPENAI_MODEL", "gpt-4.1-mini"))
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # e.g. the BPE file cannot be downloaded
+        logger.warning(f"[context] could not load a tiktoken encoding, approximating tokens: {e}")
+        return None
+
+
+# Token counts of recently seen texts, keyed by digest so that long-lived workers do not keep
+# whole page snapshots alive just to remember how long they were
+TOKEN_CACHE_SIZE = 4096
+_token_counts: "OrderedDict[bytes, int]" = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    # Cached: the same page snapshots and tool results are counted again on every model call
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _token_counts_lock:
+        if key in _token_counts:
+            _token_counts.move_to_end(key)
+            return _token_counts[key]
+    encoding = _encoding()
+    tokens = len(text) // 4 if encoding is None else len(encoding.encode(text, disallowed_special=()))
+    with _token_counts_lock:
+        _token_counts[key] = tokens
+        if len(_token_counts) > TOKEN_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return tokens
+
+
+def message_tokens(msg: BaseMessage) -> int:
+    """Tokens a message adds to the prompt, including any tool call arguments and per-message overhead."""
+    tokens = count_tokens(str(msg.content)) + 4
+    for call in getattr(msg, "tool_calls", None) or []:
+        tokens += count_tokens(json.dumps(call.get("args", {}))) + count_tokens(call.get("name", ""))
+    return tokens
+
+
+def has_initial_html(msg: BaseMessage) -> bool:
+    return isinstance(msg, HumanMessage) and INITIAL_HTML_MARKER in str(msg.content)
+
+
+def summarised_copy(msg: BaseMessage, keep: int = 80) -> BaseMessage:
+    content = str(msg.content)
+    if has_initial_html(msg):
+        # Keep the instructions, summarise only the page that follows them
+        instructions, html = content.split(INITIAL_HTML_MARKER, 1)
+        if len(html) <= keep:
+            return msg
+        summary = f"[initial page summarised, {len(html)} characters; use get_page_html for the current page]"
+        return msg.model_copy(update={"content": instructions + INITIAL_HTML_MARKER + summary})
+    if len(content) <= keep:
+        return msg
+    summary = f"[{msg.name or 'tool'} output summarised, {len(content)} characters: {content[:keep]}...]"
+    return msg.model_copy(update={"content": summary})
+
+
+def _eviction_priority(msg: BaseMessage, has_snapshot: bool = False) -> Optional[int]:
+    """Lower is evicted first; None for messages that are never summarised."""
+    if has_initial_html(msg):
+        # The initial page is the stalest HTML in the prompt once a newer snapshot exists
+        return 0 if has_snapshot else None
+    if not isinstance(msg, ToolMessage):
+        return None
+    if is_page_snapshot(msg):
+        return 0
+    if msg.name in CAPTURE_TOOLS:
+        return 1
+    if str(msg.content).startswith("OK"):
+        return 2
+    return 3
+
+
+class ContextBudget:
+    """Keeps the prompt of each model call under `max_tokens`.
+
+    Shared by the login and chat graphs. State is left untouched: when the prompt is over budget,
+    older tool outputs are replaced by one-line summaries in the list sent to the model. Old page
+    snapshots go first (including the initial page HTML in the first HumanMessage, once a newer
+    snapshot exists), then capture (screenshot/HTML file) results, then plain "OK" results, then
+    any other tool output, oldest first within each group. The latest page snapshot and the
+    results of the most recent tool step are never summarised.
+    """
+
+    def __init__(self, max_tokens: int = CONTEXT_MAX_TOKENS):
+        self.max_tokens = max_tokens
+
+    def fit(self, messages: Sequence[BaseMessage], latest_snapshot: Optional[ToolMessage] = None) -> List[BaseMessage]:
+        fitted = list(messages)
+        sizes = [message_tokens(msg) for msg in fitted]
+        total = before = sum(sizes)
+        if total <= self.max_tokens:
+            logger.debug(f"[context] prompt {total} tokens (budget {self.max_tokens})")
+            return fitted
+
+        # Tool results after the last model response belong to the step the model is about to react to
+        last_ai = max((i for i, msg in enumerate(fitted) if msg.type == "ai"), default=len(fitted))
+        protected = {latest_snapshot.id} if latest_snapshot is not None else set()
+        candidates = sorted(
+            (priority, i)
+            for i, msg in enumerate(fitted[:last_ai])
+            if msg.id not in protected and (priority := _eviction_priority(msg, latest_snapshot is not None)) is not None
+        )
+        summarised = 0
+        for _, i in candidates:
+            if total <= self.max_tokens:
+                break
+            copy = summarised_copy(fitted[i])
+            if copy is fitted[i]:
+                continue
+            fitted[i] = copy
+            size = message_tokens(copy)
+            total -= sizes[i] - size
+            sizes[i] = size
+            summarised += 1
+
+        level = logging.INFO if total <= self.max_tokens else logging.WARNING
+        logger.log(
+            level,
+            f"[context] prompt {before} -> {total} tokens (budget {self.max_tokens}), "
+            f"saved {before - total} by summarising {summarised} message(s)",
+        )
+        return fitted
+
+
+if __name__ == "__main__":
+    # Build-time prefetch of the tiktoken BPE file (into TIKTOKEN_CACHE_DIR), so that runs do not download it
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    if _encoding() is None:
+        raise SystemExit("Could not load a tiktoken encoding")
+    logger.info(f"[context] tiktoken encoding ready: {_encoding().name}")
@@ -0,0 +1,137 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.messages import BaseMessage
+from openai import RateLimitError
+
+
+logger = logging.getLogger(__name__)
+
+# Minimum gap between model calls across all runs in this process (0 = no pacing)
+AGENT_MIN_INTERVAL = float(os.getenv("AGENT_MIN_INTERVAL", "0"))
+# How many times a call is retried after a 429 before giving up
+AGENT_429_RETRIES = int(os.getenv("AGENT_429_RETRIES", "5"))
+AGENT_429_MAX_BACKOFF = float(os.getenv("AGENT_429_MAX_BACKOFF", "60"))
+
+
+class RateLimiter:
+    """Spaces model calls at least `min_interval` seconds apart, shared by every run in the process.
+
+    A 429 from any run pushes the next slot back for all of them via `penalise`.
+    """
+
+    def __init__(self, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next call slot and return how many seconds the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at)
+            self._next_at = start + self.min_interval
+            return start - now
+
+    def penalise(self, seconds: float) -> None:
+        with self._lock:
+            self._next_at = max(self._next_at, time.monotonic() + seconds)
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter() -> RateLimiter:
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(AGENT_MIN_INTERVAL)
+        return _shared_limiter
+
+
+def _retry_after(error: RateLimitError, attempt: int) -> float:
+    """Seconds to back off after a 429: the server's Retry-After if given, else exponential with jitter."""
+    try:
+        header = error.response.headers.get("retry-after")
+        if header is not None:
+            return min(float(header), AGENT_429_MAX_BACKOFF)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return min(2 ** attempt + random.uniform(0, 1), AGENT_429_MAX_BACKOFF)
+
+
+class Pacer:
+    """Per-run pacing of model calls: waits only for the shared rate limiter and backs off on 429s.
+
+    `baseline_sleep` is the fixed sleep this replaced, used to report the time saved per run.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, baseline_sleep: float = 0.0):
+        self.limiter = limiter or shared_limiter()
+        self.baseline_sleep = baseline_sleep
+        self.calls = 0
+        self.waited = 0.0
+        self.rate_limited = 0
+
+    def invoke(self, model: Any, messages: List[BaseMessage]) -> Any:
+        for attempt in range(AGENT_429_RETRIES + 1):
+            delay = self.limiter.reserve()
+            if delay > 0:
+                time.sleep(delay)
+            self.waited += delay
+            try:
+                response = model.invoke(messages)
+                self.calls += 1
+                return response
+            except RateLimitError as e:
+                if attempt == AGENT_429_RETRIES:
+                    raise
+                self._on_rate_limited(e, attempt)
+
+    async def ainvoke(self, model: Any, messages: List[BaseMessage]) -> Any:
+        for attempt in range(AGENT_429_RETRIES + 1):
+            delay = self.limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.waited += delay
+            try:
+                response = await model.ainvoke(messages)
+                self.calls += 1
+                return response
+            except RateLimitError as e:
+                if attempt == AGENT_429_RETRIES:
+                    raise
+                self._on_rate_limited(e, attempt)
+
+    def _on_rate_limited(self, error: RateLimitError, attempt: int) -> None:
+        backoff = _retry_after(error, attempt)
+        self.rate_limited += 1
+        self.limiter.penalise(backoff)
+        logger.warning(f"[pacing] rate limited (429), backing off {backoff:.1f}s (attempt {attempt + 1}/{AGENT_429_RETRIES})")
+
+    def log_summary(self, run_name: str) -> None:
+        summary = f"[pacing] {run_name}: {self.calls} model call(s), waited {self.waited:.1f}s, {self.rate_limited} rate-limited"
+        if self.baseline_sleep:
+            saved = self.calls * self.baseline_sleep - self.waited
+            summary += f", saved {saved:.1f}s vs fixed {self.baseline_sleep:g}s sleep"
+        logger.info(summary)
@@ -0,0 +1,323 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Record-and-replay fast path for the login and chat flows.
+
+After a successful agent run, the tool calls that acted on the page are taken from its
+execution trace and stored under a fingerprint of the page the run started on. The next run that
+starts on a page with the same fingerprint replays them through the same tools, without the
+model. If any step fails, or the result cannot be verified, the caller falls back to the agent.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from langchain_core.tools import BaseTool
+from selenium import webdriver
+
+from .runtime import RunContext
+from .selector_cache import is_page_load_selector
+from .tools import compact_dom_elements
+from .trace import read_trace
+
+
+logger = logging.getLogger(__name__)
+
+REPLAY_ENABLED = os.getenv("REPLAY_ENABLED", "1").lower() not in ("0", "false", "no")
+REPLAY_DIR = Path(os.getenv("REPLAY_DIR", "artefacts/replay"))
+# Recordings kept per flow (most recent first); older page fingerprints are dropped
+REPLAY_MAX_RECORDINGS = int(os.getenv("REPLAY_MAX_RECORDINGS", "10"))
+
+# Tools that only observe the page (or report on it); they are not needed to reproduce a run
+OBSERVE_TOOLS = {"get_page_html", "get_page_changes", "check_is_logged_in", "report_completion"}
+FAILED_PREFIXES = ("Error", "Timeout", "Unsupported")
+# A replayed response shorter than this, or whose text ends with an error marker, fails verification
+# (the agent then runs and judges the page itself)
+REPLAY_MIN_RESPONSE_CHARS = int(os.getenv("REPLAY_MIN_RESPONSE_CHARS", "20"))
+REPLAY_ERROR_MARKERS = tuple(
+    m.strip().lower() for m in os.getenv(
+        "REPLAY_ERROR_MARKERS",
+        "error,unavailable,something went wrong,rate limit,try again,failed to,timed out,overloaded",
+    ).split(",") if m.strip()
+)
+
+_lock = threading.Lock()
+
+# (ok, detail) given the (step, result) pairs of a completed replay
+Verifier = Callable[[List[Tuple[Dict[str, Any], Any]]], Tuple[bool, str]]
+
+
+def page_fingerprint(driver: webdriver.Chrome) -> str:
+    """Hash of the page's URL path and the structure of its interactive elements.
+
+    Only elements with a natural selector (id, name, aria-label, ...) are included, so per-load ids
+    and text that changes between runs (e.g. conversation titles) do not change the fingerprint.
+    """
+    parts = urlsplit(driver.current_url)
+    elements = []
+    try:
+        for el in compact_dom_elements(driver)["elements"]:
+            if el.get("interactive") and not el["selector"].startswith("[data-pllm-id"):
+                elements.append(f"{el['tag']}|{el.get('type', '')}|{el.get('role', '')}|{el['selector']}")
+    except Exception as e:
+        logger.warning(f"[replay] could not read page elements, fingerprinting the URL only: {e}")
+    payload = "\n".join([parts.netloc + parts.path, *sorted(set(elements))])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _recordings_path(flow: str) -> Path:
+    return REPLAY_DIR / f"{flow}.json"
+
+
+def _read_recordings(flow: str) -> Dict[str, Any]:
+    fp = _recordings_path(flow)
+    if not fp.exists():
+        return {}
+    try:
+        return json.loads(fp.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"[replay] ignoring unreadable recordings at {fp}: {e}")
+        return {}
+
+
+def _without_page_load_selectors(args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """`args` with per-page-load [data-pllm-id] selectors removed, or None if a step cannot do without one.
+
+    Those ids are renumbered on every page load, so a recorded one may name a different element
+    in the replay. A step (or run_actions action) that also names a role keeps only the role and
+    finds its element through the selector cache; one without a role cannot be replayed.
+    """
+    def strip(target: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not is_page_load_selector(target.get("selector", "")):
+            return target
+        if not target.get("role"):
+            return None
+        return {**target, "selector": ""}
+
+    args = strip(args)
+    if args is None:
+        return None
+    if isinstance(args.get("actions"), list):
+        actions = [strip(action) if isinstance(action, dict) else action for action in args["actions"]]
+        if any(action is None for action in actions):
+            return None
+        args = {**args, "actions": actions}
+    return args
+
+
+def steps_from_trace(trace: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The successful, page-acting tool calls of a run, in order, from its execution trace.
+
+    A step that relies on a per-page-load [data-pllm-id] selector without a role is flagged with
+    "page_load_selector": True (see _without_page_load_selectors); record_replay skips such runs.
+    """
+    calls, results = [], {}
+    for step in trace.get("steps", []):
+        for node_state in step.values():
+            for msg in node_state.get("messages", []):
+                if msg.get("type") == "AIMessage":
+                    calls.extend(msg.get("tool_calls") or [])
+                elif msg.get("type") == "ToolMessage":
+                    results.setdefault(msg.get("tool_call_id"), msg.get("content"))
+
+    steps = []
+    for call in calls:
+        if call.get("name") in OBSERVE_TOOLS or call.get("id") not in results:
+            continue
+        if str(results[call["id"]]).startswith(FAILED_PREFIXES):
+            continue
+        args = call.get("args") or {}
+        replayable = _without_page_load_selectors(args)
+        if replayable is None:
+            steps.append({"name": call["name"], "args": args, "page_load_selector": True})
+        else:
+            steps.append({"name": call["name"], "args": replayable})
+    return steps
+
+
+def _redact(steps: List[Dict[str, Any]], creds: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Swap any raw credential the agent typed back to the placeholder type_text substitutes.
+
+    Nested arguments (e.g. the actions of run_actions) are scrubbed too.
+    """
+    secrets = {creds.get("password"): "<PASSWORD>", creds.get("email"): "<EMAIL>"}
+    secrets.pop(None, None)
+    secrets.pop("", None)
+
+    def scrub(value: Any) -> Any:
+        if isinstance(value, str):
+            for secret, placeholder in secrets.items():
+                value = value.replace(secret, placeholder)
+            return value
+        if isinstance(value, dict):
+            return {key: scrub(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [scrub(item) for item in value]
+        return value
+
+    for step in steps:
+        step["args"] = scrub(step["args"])
+    return steps
+
+
+def record_replay(
+    flow: str,
+    key: Optional[str],
+    trace_file: Path,
+    creds: Optional[Dict[str, str]] = None,
+    required_tools: Sequence[str] = (),
+) -> Optional[Path]:
+    """Store the page-acting steps of a successful run, keyed by the fingerprint of its start page.
+
+    Nothing is stored unless the steps include every tool in `required_tools`, e.g. the step the
+    replay is verified from; such a recording would always replay in full and then fail.
+    """
+    if not (REPLAY_ENABLED and key):
+        return None
+    try:
+        trace = read_trace(trace_file)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"[replay] cannot record {flow}, trace unreadable: {e}")
+        return None
+    steps = _redact(steps_from_trace(trace), creds or {})
+    if not steps:
+        return None
+    if any(step.get("page_load_selector") for step in steps):
+        logger.info(f"[replay] not recording {flow}: a step used a per-page-load [data-pllm-id] selector without a role")
+        return None
+    missing = set(required_tools) - {step["name"] for step in steps}
+    if missing:
+        logger.info(f"[replay] not recording {flow}: the run never called {', '.join(sorted(missing))}")
+        return None
+
+    with _lock:
+        recordings = _read_recordings(flow)
+        recordings[key] = {"steps": steps, "recorded_at": time.time(), "run_id": trace.get("run_id")}
+        recent = sorted(recordings.items(), key=lambda kv: kv[1].get("recorded_at", 0), reverse=True)
+        recordings = dict(recent[:REPLAY_MAX_RECORDINGS])
+
+        fp = _recordings_path(flow)
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        tmp = fp.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(recordings, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(fp)
+    logger.info(f"[replay] recorded {len(steps)} step(s) for {flow} page {key}")
+    return fp
+
+
+def _save_replay_trace(ctx: RunContext, flow: str, key: str, results: List[Tuple[Dict[str, Any], Any]], ok: bool, detail: str) -> None:
+    trace = {
+        "run_type": flow,
+        "mode": "replay",
+        "page_fingerprint": key,
+        "timestamp": datetime.utcnow().isoformat(),
+        "steps": [{"name": step["name"], "args": step["args"], "result": str(result)} for step, result in results],
+        "ok": ok,
+        "detail": detail,
+    }
+    with (Path(ctx.artefacts_dir) / "replay_trace.json").open("w", encoding="utf-8") as f:
+        json.dump(trace, f, indent=2, ensure_ascii=False)
+
+
+def try_replay(flow: str, key: Optional[str], tools: Sequence[BaseTool], ctx: RunContext, verify: Verifier) -> Tuple[bool, str]:
+    """Replay the recording for `key`, if any. Returns (ok, detail); on False the caller runs the agent.
+
+    The attempt is written to replay_trace.json in the run's artefacts directory.
+    """
+    if not (REPLAY_ENABLED and key):
+        return False, "replay disabled"
+    recording = _read_recordings(flow).get(key)
+    if not recording:
+        logger.info(f"[replay] no recording for {flow} page {key}")
+        return False, "no recording"
+
+    # Recordings stored before per-page-load selectors were excluded: check before acting on the page
+    if any(_without_page_load_selectors(step["args"]) is None for step in recording["steps"]):
+        logger.info(f"[replay] recording for {flow} page {key} uses per-page-load selectors, not replaying it")
+        return False, "recording uses per-page-load selectors"
+
+    by_name = {t.name: t for t in tools}
+    config = ctx.as_config()
+    results: List[Tuple[Dict[str, Any], Any]] = []
+    t0 = time.monotonic()
+    ok, detail = True, ""
+    for i, step in enumerate(recording["steps"], start=1):
+        tool = by_name.get(step["name"])
+        try:
+            if tool is None:
+                raise KeyError(f"unknown tool {step['name']}")
+            result = tool.invoke(step["args"], config=config)
+        except Exception as e:
+            result = f"Error: {e}"
+        results.append((step, result))
+        if str(result).startswith(FAILED_PREFIXES):
+            ok, detail = False, f"step {i}/{len(recording['steps'])} {step['name']} failed: {str(result)[:200]}"
+            break
+
+    if ok:
+        ok, detail = verify(results)
+    _save_replay_trace(ctx, flow, key, results, ok, detail)
+    elapsed = time.monotonic() - t0
+    if ok:
+        logger.info(f"[replay] {flow} replayed {len(results)} step(s) in {elapsed:.1f}s: {detail}")
+    else:
+        logger.warning(f"[replay] {flow} replay failed after {elapsed:.1f}s, falling back to the agent: {detail}")
+    return ok, detail
+
+
+def chat_health_from_results(results: List[Tuple[Dict[str, Any], Any]]) -> Tuple[bool, str]:
+    """Verify a replayed chat run from its watch_responses results.
+
+    Every panel must have completed with a response of at least REPLAY_MIN_RESPONSE_CHARS whose
+    final text (tail) contains none of REPLAY_ERROR_MARKERS, the empty and error responses the
+    agent would report as ERROR.
+
+    Panels that were already on the page when the watch started and never changed (an earlier
+    turn's responses) are not part of the turn being watched, so they are not judged.
+    """
+    watched = []
+    for step, result in results:
+        if step["name"] != "watch_responses":
+            continue
+        try:
+            watched.append(json.loads(result))
+        except (TypeError, json.JSONDecodeError):
+            return False, f"unreadable watch_responses result: {str(result)[:200]}"
+    if not watched:
+        return False, "no watch_responses step to verify the chat with"
+
+    slowest = 0
+    for i, watch in enumerate(watched, start=1):
+        panels = [p for p in watch.get("panels", []) if p.get("responded") or not p.get("preexisting")]
+        incomplete = [p.get("label") or str(p.get("index")) for p in panels if not p.get("completed")]
+        if watch.get("timed_out") or not panels or incomplete:
+            return False, f"turn {i}: response panel(s) incomplete: {', '.join(incomplete) or 'none found'}"
+        for p in panels:
+            label = p.get("label") or str(p.get("index"))
+            tail = (p.get("tail") or "").lower()
+            if (p.get("final_length") or 0) < REPLAY_MIN_RESPONSE_CHARS:
+                return False, f"turn {i}: response panel {label} is empty or too short ({p.get('final_length') or 0} characters)"
+            marker = next((m for m in REPLAY_ERROR_MARKERS if m in tail), None)
+            if marker:
+                return False, f"turn {i}: response panel {label} looks like an error ({marker!r}): {p.get('tail', '')[-120:]}"
+        slowest = max([slowest] + [p.get("complete_ms") or 0 for p in panels])
+    return True, f"Replayed {len(watched)} turn(s); all response panels completed (slowest {slowest / 1000:.1f}s)"
@@ -0,0 +1,78 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from langchain_core.runnables import RunnableConfig
+from selenium import webdriver
+
+
+@dataclass
+class RunContext:
+    """Everything that is specific to one graph run.
+
+    Graphs and tools are built once per process; the run context travels with each invocation
+    in `config["configurable"]["run_context"]`, so many runs can share them concurrently.
+    """
+    driver: webdriver.Chrome
+    artefacts_dir: Path
+    creds: Dict[str, str] = field(default_factory=dict)
+    pacer: Optional[Any] = None
+    # Fingerprint of the page the run started on, used to look up and store replay recordings
+    replay_key: Optional[str] = None
+
+    def as_config(self, **config: Any) -> RunnableConfig:
+        """Build the config to invoke a graph or tool with, e.g. `ctx.as_config(recursion_limit=25)`."""
+        return {**config, "configurable": {**config.pop("configurable", {}), "run_context": self}}
+
+
+def get_run_context(config: RunnableConfig) -> RunContext:
+    try:
+        return config["configurable"]["run_context"]
+    except (KeyError, TypeError):
+        raise RuntimeError("No run_context in config; invoke the graph or tool with RunContext.as_config()")
+
+
+class _SharedPageSource:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.html: Optional[str] = None
+
+
+_shared_page_source: ContextVar[Optional[_SharedPageSource]] = ContextVar("shared_page_source", default=None)
+
+
+@contextmanager
+def shared_page_source() -> Iterator[None]:
+    """Within this block (and in contexts copied from it), page_source() fetches the page at most once."""
+    token = _shared_page_source.set(_SharedPageSource())
+    try:
+        yield
+    finally:
+        _shared_page_source.reset(token)
+
+
+def page_source(driver: webdriver.Chrome) -> str:
+    shared = _shared_page_source.get()
+    if shared is None:
+        return driver.page_source
+    with shared.lock:
+        if shared.html is None:
+            shared.html = driver.page_source
+        return shared.html
@@ -0,0 +1,152 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+
+from .runtime import shared_page_source
+
+
+logger = logging.getLogger(__name__)
+
+# Tools that only read the page (or write artefacts from it). Anything else - including unknown
+# tools, sleep and wait_for - is treated as mutating and acts as a barrier between batches.
+READ_ONLY_TOOLS = {
+    "get_page_html",
+    "get_page_changes",
+    "get_cached_selectors",
+    "check_is_logged_in",
+    "save_chat_capture",
+    "post_login_capture",
+    "report_completion",
+}
+# Read-only tools that take a compact snapshot: each one replaces the per-driver get_page_changes
+# baseline (and tags elements with data-pllm-id), so within a batch they run one at a time, in
+# call order, while the other reads proceed concurrently
+SNAPSHOT_TOOLS = {"get_page_html", "get_page_changes"}
+MAX_CONCURRENT_READS = 4
+
+
+class ToolScheduler:
+    """Runs the tool calls of the last AIMessage against one shared driver, replacing ToolNode.
+
+    Consecutive read-only calls run concurrently and share a single page_source fetch, except that
+    snapshot-taking calls (SNAPSHOT_TOOLS) within a batch run one after another; mutating
+    calls (click, type_text, ...) run one at a time, in the order the model issued them. Results
+    are returned in call order, with failures as ToolMessages with status="error".
+    Invoke like ToolNode: `scheduler.invoke(state, config)` -> {"messages": [...]}.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool]):
+        self.tools_by_name = {t.name: t for t in tools}
+        self._executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_READS, thread_name_prefix="tool-read")
+
+    def _batches(self, tool_calls: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Split calls into batches: each run of read-only calls is one batch, each mutating call its own."""
+        batches: List[List[Dict[str, Any]]] = []
+        for call in tool_calls:
+            if call["name"] in READ_ONLY_TOOLS and batches and batches[-1][0]["name"] in READ_ONLY_TOOLS:
+                batches[-1].append(call)
+            else:
+                batches.append([call])
+        return batches
+
+    def _run_call(self, call: Dict[str, Any], config: RunnableConfig) -> ToolMessage:
+        tool = self.tools_by_name.get(call["name"])
+        try:
+            if tool is None:
+                raise ValueError(f"{call['name']} is not a valid tool, try one of [{', '.join(self.tools_by_name)}]")
+            result = tool.invoke({**call, "type": "tool_call"}, config)
+            if isinstance(result, ToolMessage):
+                return result
+            return ToolMessage(content=str(result), name=call["name"], tool_call_id=call["id"])
+        except Exception as e:
+            logger.error(f"[scheduler] {call['name']} failed: {e}")
+            return ToolMessage(content=f"Error: {e}", name=call["name"], tool_call_id=call["id"], status="error")
+
+    def _run_serially(self, calls: List[Dict[str, Any]], config: RunnableConfig) -> List[ToolMessage]:
+        return [self._run_call(call, config) for call in calls]
+
+    def _split(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split a read-only batch into (calls run concurrently, snapshot calls run in order)."""
+        return [c for c in batch if c["name"] not in SNAPSHOT_TOOLS], [c for c in batch if c["name"] in SNAPSHOT_TOOLS]
+
+    def _in_call_order(self, batch: List[Dict[str, Any]], messages: List[ToolMessage]) -> List[ToolMessage]:
+        by_id = {m.tool_call_id: m for m in messages}
+        return [by_id[call["id"]] for call in batch]
+
+    def _tool_calls(self, state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        last = state["messages"][-1]
+        return list(last.tool_calls) if isinstance(last, AIMessage) else []
+
+    def _log(self, calls: List[Dict[str, Any]], batches: List[List[Dict[str, Any]]], t0: float) -> None:
+        concurrent = sum(len(b) for b in batches if len(b) > 1)
+        logger.info(
+            f"[scheduler] {len(calls)} call(s) in {len(batches)} batch(es), {concurrent} run concurrently, "
+            f"{time.monotonic() - t0:.2f}s"
+        )
+
+    def invoke(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        calls = self._tool_calls(state)
+        batches = self._batches(calls)
+        t0 = time.monotonic()
+        messages: List[ToolMessage] = []
+        for batch in batches:
+            if len(batch) == 1:
+                messages.append(self._run_call(batch[0], config))
+                continue
+            concurrent, serial = self._split(batch)
+            with shared_page_source():
+                # Each call runs in a copy of this context, so they all see the same page_source snapshot
+                futures = [
+                    self._executor.submit(contextvars.copy_context().run, self._run_call, call, config) for call in concurrent
+                ]
+                if serial:
+                    futures.append(self._executor.submit(contextvars.copy_context().run, self._run_serially, serial, config))
+                results: List[ToolMessage] = []
+                for f in futures:
+                    result = f.result()
+                    results.extend(result if isinstance(result, list) else [result])
+                messages.extend(self._in_call_order(batch, results))
+        self._log(calls, batches, t0)
+        return {"messages": messages}
+
+    async def ainvoke(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        calls = self._tool_calls(state)
+        batches = self._batches(calls)
+        t0 = time.monotonic()
+        messages: List[ToolMessage] = []
+        for batch in batches:
+            if len(batch) == 1:
+                messages.append(await asyncio.to_thread(self._run_call, batch[0], config))
+                continue
+            concurrent, serial = self._split(batch)
+            with shared_page_source():
+                # asyncio.to_thread copies the current context into the worker thread
+                results = await asyncio.gather(
+                    *[asyncio.to_thread(self._run_call, call, config) for call in concurrent],
+                    asyncio.to_thread(self._run_serially, serial, config),
+                )
+                flat = [m for r in results for m in (r if isinstance(r, list) else [r])]
+                messages.extend(self._in_call_order(batch, flat))
+        self._log(calls, batches, t0)
+        return {"messages": messages}
@@ -0,0 +1,137 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from selenium.webdriver.remote.webelement import WebElement
+
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_DIR = Path(os.getenv("SELECTOR_DIR", "artefacts/selectors"))
+
+# Suggested role names, so runs (and flows) agree on what to call the same element
+COMMON_ROLES = ("email_field", "password_field", "login_button", "prompt_box", "submit_button", "new_chat_button")
+
+
+# Selectors built from the per-page-load ids the compact DOM assigns (see COMPACT_DOM_JS). They
+# are renumbered on every load, so they can point at a different element next time.
+PAGE_LOAD_ID_PREFIX = "[data-pllm-id"
+
+
+def is_page_load_selector(selector: str) -> bool:
+    return (selector or "").startswith(PAGE_LOAD_ID_PREFIX)
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc or "unknown"
+
+
+def element_fingerprint(el: WebElement) -> str:
+    """Describes what kind of element a selector found, to notice when it starts matching something else."""
+    attrs = [el.tag_name or ""] + [el.get_attribute(name) or "" for name in ("type", "name", "role")]
+    return "|".join(a.lower() for a in attrs)
+
+
+class SelectorCache:
+    """Persistent role -> selector cache, one JSON file per site host.
+
+    Entries are written when a tool succeeds with a role and dropped when a cached selector stops
+    finding the element (or finds a different kind of element). Shared by every run in the process.
+    """
+
+    def __init__(self, root: Path = SELECTOR_DIR):
+        self.root = root
+        self._hosts: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, host: str) -> Path:
+        return self.root / f"{host.replace(':', '_')}.json"
+
+    def _entries(self, host: str) -> Dict[str, Dict[str, Any]]:
+        # Called with the lock held
+        if host not in self._hosts:
+            fp = self._path(host)
+            try:
+                self._hosts[host] = json.loads(fp.read_text(encoding="utf-8")) if fp.exists() else {}
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"[selectors] ignoring unreadable cache {fp}: {e}")
+                self._hosts[host] = {}
+        return self._hosts[host]
+
+    def _save(self, host: str) -> None:
+        # Called with the lock held
+        fp = self._path(host)
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        tmp = fp.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._hosts[host], indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(fp)
+
+    def get(self, host: str, role: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries(host).get(role)
+            if entry and is_page_load_selector(entry["selector"]):
+                # Cached before such selectors were excluded; never valid on a later page load
+                self._entries(host).pop(role)
+                self._save(host)
+                logger.info(f"[selectors] {host}: invalidated {role} (per-page-load selector)")
+                return None
+            return dict(entry) if entry else None
+
+    def all(self, host: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                role: dict(entry) for role, entry in self._entries(host).items()
+                if not is_page_load_selector(entry["selector"])
+            }
+
+    def remember(self, host: str, role: str, by: str, selector: str, fingerprint: str) -> None:
+        if is_page_load_selector(selector):
+            logger.debug(f"[selectors] {host}: not caching per-page-load selector {selector} for {role}")
+            return
+        with self._lock:
+            entries = self._entries(host)
+            entry = entries.get(role)
+            if entry and (entry["by"], entry["selector"], entry["fingerprint"]) == (by, selector, fingerprint):
+                entry["last_used"] = time.time()
+                return
+            entries[role] = {"by": by, "selector": selector, "fingerprint": fingerprint, "last_used": time.time()}
+            self._save(host)
+        logger.info(f"[selectors] {host}: {role} -> {by}={selector}")
+
+    def forget(self, host: str, role: str, reason: str = "") -> None:
+        with self._lock:
+            if self._entries(host).pop(role, None) is None:
+                return
+            self._save(host)
+        logger.info(f"[selectors] {host}: invalidated {role} {reason}".rstrip())
+
+
+_shared_cache: Optional[SelectorCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_selector_cache() -> SelectorCache:
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SelectorCache()
+        return _shared_cache
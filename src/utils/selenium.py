@@ -12,7 +12,19 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-from contextlib import contextmanager
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -20,19 +32,300 @@ from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
 
-@contextmanager
-def get_driver(headless: bool = False):
+logger = logging.getLogger(__name__)
+
+DRIVER_MANIFEST = Path(os.getenv(
+    "CHROMEDRIVER_MANIFEST",
+    str(Path.home() / ".cache" / "parallellm-qa" / "chromedriver.json"),
+))
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")
+
+
+def _binary_version(binary: str) -> Optional[str]:
+    """Return the dotted version reported by `<binary> --version`, or None if it cannot be run."""
+    try:
+        out = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r"\d+(?:\.\d+)+", out)
+    return match.group(0) if match else None
+
+
+def _major(version: Optional[str]) -> Optional[str]:
+    return version.split(".")[0] if version else None
+
+
+def installed_chrome_version() -> Optional[str]:
+    for name in CHROME_BINARIES:
+        binary = shutil.which(name)
+        if binary:
+            return _binary_version(binary)
+    return None
+
+
+def _read_manifest() -> Dict[str, Any]:
+    try:
+        with DRIVER_MANIFEST.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest: Dict[str, Any]) -> None:
+    try:
+        DRIVER_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+        with DRIVER_MANIFEST.open("w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+    except OSError as e:
+        logger.warning(f"[chromedriver] could not write manifest {DRIVER_MANIFEST}: {e}")
+
+
+def cache_chromedriver() -> Dict[str, Any]:
+    """Resolve chromedriver with webdriver-manager and pin the result in the manifest.
+
+    Run at image build time (`python -m src.utils.selenium`) so that runtime never needs the network.
+    """
+    chrome_version = installed_chrome_version()
+    t0 = time.monotonic()
+    path = ChromeDriverManager().install()
+    manifest = {
+        "path": path,
+        "driver_version": _binary_version(path),
+        "chrome_version": chrome_version,
+        "resolve_seconds": round(time.monotonic() - t0, 3),
+        "resolved_at": datetime.utcnow().isoformat(),
+    }
+    _write_manifest(manifest)
+    logger.info(f"[chromedriver] pinned {path} (driver={manifest['driver_version']}, chrome={chrome_version}) in {DRIVER_MANIFEST}")
+    return manifest
+
+
+def resolve_chromedriver() -> str:
+    """Return a chromedriver path, skipping webdriver-manager when the pinned binary matches the installed Chrome."""
+    t0 = time.monotonic()
+    chrome_version = installed_chrome_version()
+    manifest = _read_manifest()
+    path = manifest.get("path")
+
+    if path and Path(path).exists() and chrome_version and _major(manifest.get("driver_version")) == _major(chrome_version):
+        elapsed = time.monotonic() - t0
+        baseline = manifest.get("resolve_seconds")
+        saved = f", saved ~{baseline - elapsed:.2f}s vs webdriver-manager" if baseline is not None else ""
+        logger.info(f"[chromedriver] using cached {path} (chrome={chrome_version}) in {elapsed:.2f}s{saved}")
+        return path
+
+    logger.info(f"[chromedriver] no usable cache for chrome={chrome_version} in {DRIVER_MANIFEST}, resolving with webdriver-manager")
+    try:
+        return cache_chromedriver()["path"]
+    except Exception as e:
+        # Offline fallback: a chromedriver on PATH is fine if it matches the installed Chrome
+        on_path = shutil.which("chromedriver")
+        if on_path and _major(_binary_version(on_path)) == _major(chrome_version):
+            logger.warning(f"[chromedriver] webdriver-manager failed ({e}), falling back to {on_path}")
+            return on_path
+        raise
+
+
+def new_driver(headless: bool = False) -> webdriver.Chrome:
+    """Start a fresh Chrome instance. The caller is responsible for quitting it."""
     options = Options()
     if headless:
         options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+    service = Service(resolve_chromedriver())
+    return webdriver.Chrome(service=service, options=options)
+
+
+@contextmanager
+def get_driver(headless: bool = False):
+    driver = new_driver(headless=headless)
 
     try:
         yield driver
     finally:
         driver.quit()
 
+
+def is_driver_healthy(driver: webdriver.Chrome) -> bool:
+    """Return True if the browser behind the driver still responds to commands."""
+    try:
+        _ = driver.window_handles
+        driver.execute_script("return 1")
+        return True
+    except Exception as e:
+        logger.warning(f"[pool] driver health check failed: {e}")
+        return False
+
+
+def reset_driver(driver: webdriver.Chrome) -> None:
+    """Clear cookies and storage for every origin so the next lease starts from a bare browser.
+
+    delete_all_cookies() and localStorage.clear() only reach the current document's origin, so this
+    goes through the DevTools protocol instead. Any failure propagates, and the pool then recycles
+    the driver rather than lending out a browser that may still hold another session.
+    """
+    try:
+        origin = driver.execute_script("return window.location.origin")
+    except Exception:
+        origin = None
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    for o in {"*", origin} - {None, "null", ""}:
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": o, "storageTypes": "all"})
+    driver.get("about:blank")
+
+
+def _quit_quietly(driver: webdriver.Chrome) -> None:
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"[pool] error while quitting driver: {e}")
+
+
+class DriverPool:
+    """A bounded pool of long-lived Chrome drivers that runs can lease from.
+
+    Drivers are started lazily (up to `size`), health-checked before every lease, and
+    recycled after `max_uses` leases or when a lease leaves the browser unresponsive.
+    """
+
+    def __init__(self, size: int = 1, max_uses: int = 20, headless: bool = False):
+        if size < 1:
+            raise ValueError(f"Driver pool size must be at least 1, got {size}")
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        # Guards _idle and _started; notified whenever a driver is returned or a slot is freed
+        self._cond = threading.Condition()
+        self._idle: List[webdriver.Chrome] = []
+        self._uses: Dict[int, int] = {}
+        self._started = 0
+        self._closed = False
+
+    def __enter__(self) -> "DriverPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def warm(self) -> None:
+        """Start every driver in the pool up front, so that the first lease is not a cold start."""
+        drivers = []
+        try:
+            while True:
+                with self._cond:
+                    if self._started >= self.size:
+                        break
+                    self._started += 1
+                drivers.append(self._start_driver())
+        finally:
+            # Drivers started before a failed start are still handed to the pool, not leaked
+            with self._cond:
+                self._idle.extend(drivers)
+                self._cond.notify_all()
+
+    def _start_driver(self) -> webdriver.Chrome:
+        t0 = time.monotonic()
+        try:
+            driver = new_driver(headless=self.headless)
+        except Exception:
+            with self._cond:
+                self._started -= 1
+                self._cond.notify()
+            raise
+        self._uses[id(driver)] = 0
+        logger.info(f"[pool] started driver in {time.monotonic() - t0:.2f}s ({self._started}/{self.size})")
+        return driver
+
+    def _retire(self, driver: webdriver.Chrome, reason: str) -> None:
+        logger.info(f"[pool] recycling driver ({reason})")
+        self._uses.pop(id(driver), None)
+        _quit_quietly(driver)
+        with self._cond:
+            self._started -= 1
+            # A waiter can now start a replacement
+            self._cond.notify()
+
+    def _acquire(self, timeout: Optional[float]) -> webdriver.Chrome:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    if self._idle:
+                        driver, start = self._idle.pop(), False
+                        break
+                    if self._started < self.size:
+                        self._started += 1
+                        driver, start = None, True
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No driver became available within {timeout}s")
+                    self._cond.wait(remaining)
+
+            if start:
+                return self._start_driver()
+            if is_driver_healthy(driver):
+                return driver
+            self._retire(driver, reason="failed health check")
+
+    def _release(self, driver: webdriver.Chrome, failed: bool) -> None:
+        self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+        if self._closed:
+            self._retire(driver, reason="pool closed")
+        elif failed and not is_driver_healthy(driver):
+            self._retire(driver, reason="crashed during lease")
+        elif self._uses[id(driver)] >= self.max_uses:
+            self._retire(driver, reason=f"reached {self.max_uses} uses")
+        else:
+            try:
+                reset_driver(driver)
+            except Exception as e:
+                self._retire(driver, reason=f"reset failed: {e}")
+                return
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """Lease a driver from the pool for the duration of the `with` block."""
+        driver = self._acquire(timeout)
+        failed = False
+        try:
+            yield driver
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(driver, failed=failed)
+
+    @asynccontextmanager
+    async def alease(self, timeout: Optional[float] = None):
+        """Async variant of lease: starting, checking and resetting drivers happens in a worker thread."""
+        driver = await asyncio.to_thread(self._acquire, timeout)
+        failed = False
+        try:
+            yield driver
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await asyncio.to_thread(self._release, driver, failed)
+
+    def close(self) -> None:
+        """Quit every idle driver. Drivers currently leased are quit when they are returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            # Waiting leases fail rather than wait for a driver that will never come back
+            self._cond.notify_all()
+        for driver in idle:
+            self._retire(driver, reason="pool closed")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    cache_chromedriver()
@@ -0,0 +1,142 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+logger = logging.getLogger(__name__)
+
+SESSION_DIR = Path(os.getenv("SESSION_DIR", "artefacts/sessions"))
+SESSION_MAX_AGE_HOURS = float(os.getenv("SESSION_MAX_AGE_HOURS", "12"))
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _session_path(profile: str) -> Path:
+    return SESSION_DIR / f"{profile}.json"
+
+
+def _wait_for_page_load(driver: webdriver.Chrome, timeout: float = 10) -> None:
+    try:
+        WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+    except Exception as e:
+        logger.warning(f"[session] page did not finish loading: {e}")
+
+
+def save_session(driver: webdriver.Chrome, profile: str) -> Optional[Path]:
+    """Snapshot the cookies and localStorage of a logged-in driver for the given login profile.
+
+    The file holds live session tokens, so it is written with owner-only permissions.
+    """
+    try:
+        snapshot = {
+            "profile": profile,
+            "origin": _origin(driver.current_url),
+            "saved_at": time.time(),
+            "cookies": driver.get_cookies(),
+            "local_storage": driver.execute_script("return Object.assign({}, window.localStorage);") or {},
+        }
+    except Exception as e:
+        logger.warning(f"[session] could not snapshot session for profile '{profile}': {e}")
+        return None
+
+    fp = _session_path(profile)
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    tmp = fp.with_suffix(".tmp")
+    with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    tmp.replace(fp)
+    logger.info(f"[session] saved {len(snapshot['cookies'])} cookie(s) and {len(snapshot['local_storage'])} storage key(s) for profile '{profile}'")
+    return fp
+
+
+def load_session(profile: str) -> Optional[Dict[str, Any]]:
+    fp = _session_path(profile)
+    if not fp.exists():
+        return None
+    try:
+        with fp.open("r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"[session] unreadable session file {fp}: {e}")
+        return None
+
+    age_hours = (time.time() - snapshot.get("saved_at", 0)) / 3600
+    if age_hours > SESSION_MAX_AGE_HOURS:
+        logger.info(f"[session] saved session for profile '{profile}' is {age_hours:.1f}h old, ignoring")
+        return None
+    return snapshot
+
+
+def restore_session(driver: webdriver.Chrome, profile: str, base_url: str) -> bool:
+    """Load a saved session into the driver and reload `base_url`.
+
+    Returns True if a snapshot was applied. The caller still has to validate that the
+    restored session is actually logged in.
+    """
+    snapshot = load_session(profile)
+    if not snapshot:
+        return False
+    if snapshot.get("origin") != _origin(base_url):
+        logger.info(f"[session] saved session is for {snapshot.get('origin')}, not {_origin(base_url)}, ignoring")
+        return False
+
+    # Cookies and storage can only be set for the origin the browser is currently on
+    if _origin(driver.current_url) != _origin(base_url):
+        driver.get(base_url)
+
+    now = time.time()
+    restored = 0
+    for cookie in snapshot.get("cookies", []):
+        if cookie.get("expiry") is not None and cookie["expiry"] < now:
+            continue
+        try:
+            driver.add_cookie(cookie)
+            restored += 1
+        except Exception as e:
+            logger.debug(f"[session] skipped cookie {cookie.get('name')}: {e}")
+
+    local_storage = snapshot.get("local_storage", {})
+    driver.execute_script(
+        "for (const [k, v] of Object.entries(arguments[0])) { window.localStorage.setItem(k, v); }",
+        local_storage,
+    )
+
+    driver.get(base_url)
+    _wait_for_page_load(driver)
+    logger.info(f"[session] restored {restored} cookie(s) and {len(local_storage)} storage key(s) for profile '{profile}'")
+    return True
+
+
+def clear_session(driver: webdriver.Chrome, profile: str) -> None:
+    """Forget a saved session that turned out to be invalid, and wipe it from the driver."""
+    _session_path(profile).unlink(missing_ok=True)
+    try:
+        driver.execute_script("window.localStorage.clear();")
+    except Exception:
+        pass
+    driver.delete_all_cookies()
+    logger.info(f"[session] cleared saved session for profile '{profile}'")
@@ -12,153 +12,535 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import json
 import logging
-import re
+import os
+import threading
 import time
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List
 
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
+from .dom import COMPACT_DOM_JS, DEFAULT_SPINNER_SELECTOR, DOM_IDLE_JS, RESPONSE_WATCH_JS
 from .files import save_html, save_screenshot
+from .html import sanitize_html
+from .runtime import get_run_context, page_source
+from .selector_cache import COMMON_ROLES, element_fingerprint, host_of, shared_selector_cache
 
 
 logger = logging.getLogger(__name__)
 
+BY_MAP = {
+    "css": By.CSS_SELECTOR,
+    "id": By.ID,
+    "name": By.NAME,
+    "xpath": By.XPATH,
+}
+WAIT_CONDITIONS = ("present", "absent", "enabled", "text_stable", "spinner_gone", "dom_idle")
 
-def build_common_tools(driver: webdriver.Chrome, creds: Dict[str, str] = None):
+# Default representation returned by get_page_html: "full" (sanitised <body> HTML) or "compact"
+PAGE_HTML_MODE = os.getenv("PAGE_HTML_MODE", "full").lower()
+# Characters from the end of each response panel returned by watch_responses
+RESPONSE_TAIL_CHARS = int(os.getenv("RESPONSE_TAIL_CHARS", "300"))
+COMPACT_MAX_TEXT = int(os.getenv("COMPACT_MAX_TEXT", "200"))
+
+
+def compact_dom_elements(driver: webdriver.Chrome, max_text: int = COMPACT_MAX_TEXT) -> Dict[str, Any]:
+    """Return {page_id, elements}: the page's visible interactive elements and text blocks as small dicts (see COMPACT_DOM_JS)."""
+    return driver.execute_script(COMPACT_DOM_JS, max_text) or {"page_id": None, "elements": []}
+
+
+def format_compact_element(el: Dict[str, Any]) -> str:
+    parts = [f"[{el['id']}] {el['tag']}"]
+    if el.get("role"):
+        parts.append(f"role={el['role']}")
+    if el.get("type"):
+        parts.append(f"type={el['type']}")
+    if el.get("label"):
+        parts.append(f"label={json.dumps(el['label'])}")
+    if el.get("text"):
+        parts.append(json.dumps(el["text"], ensure_ascii=False))
+    if el.get("disabled"):
+        parts.append("(disabled)")
+    if el.get("interactive"):
+        parts.append(f"css={el['selector']}")
+    return " ".join(parts)
+
+
+# Last compact snapshot handed to the agent, per browser session: {session_id: {"page_id": ..., "url": ..., "lines": {id: line}}}
+_page_snapshots: Dict[str, Dict[str, Any]] = {}
+_snapshot_lock = threading.Lock()
+
+
+def _take_snapshot(driver: webdriver.Chrome) -> Dict[str, Any]:
+    """Take a compact snapshot of the page and remember it as the baseline for get_page_changes."""
+    page = compact_dom_elements(driver)
+    lines = {el["id"]: format_compact_element(el) for el in page["elements"]}
+    snapshot = {"page_id": page["page_id"], "url": driver.current_url, "title": driver.title, "lines": lines}
+    with _snapshot_lock:
+        previous = _page_snapshots.get(driver.session_id)
+        _page_snapshots[driver.session_id] = snapshot
+    return {"current": snapshot, "previous": previous}
+
+
+def _render_snapshot(snapshot: Dict[str, Any]) -> str:
+    return "\n".join([f"url: {snapshot['url']}", f"title: {snapshot['title']}", *snapshot["lines"].values()])
+
+
+def compact_dom(driver: webdriver.Chrome) -> str:
+    """Render the page as one line per visible interactive element or text block."""
+    return _render_snapshot(_take_snapshot(driver)["current"])
+
+
+def page_changes(driver: webdriver.Chrome) -> str:
+    """Diff the page against the last compact snapshot taken on this driver.
+
+    Lines are prefixed with "+" (added), "-" (removed) or "~" (changed, shown in its new form).
+    The full compact page is returned instead when there is no baseline, the page was navigated or
+    reloaded (element ids are per page load), or the diff would be larger than the page itself.
+    """
+    snapshots = _take_snapshot(driver)
+    current, previous = snapshots["current"], snapshots["previous"]
+    if previous is None:
+        return "No previous snapshot; full compact page follows.\n" + _render_snapshot(current)
+    if previous["url"] != current["url"]:
+        return f"Navigated from {previous['url']}; full compact page follows.\n" + _render_snapshot(current)
+    if previous["page_id"] != current["page_id"]:
+        return "Page reloaded; full compact page follows.\n" + _render_snapshot(current)
+
+    old, new = previous["lines"], current["lines"]
+    added = [f"+ {line}" for el_id, line in new.items() if el_id not in old]
+    removed = [f"- {line}" for el_id, line in old.items() if el_id not in new]
+    changed = [f"~ {line}" for el_id, line in new.items() if el_id in old and old[el_id] != line]
+    if not (added or removed or changed):
+        return "No changes since the last snapshot."
+    diff = added + removed + changed
+    if len(diff) >= len(new):
+        return "Most of the page changed; full compact page follows.\n" + _render_snapshot(current)
+    summary = f"{len(added)} added, {len(removed)} removed, {len(changed)} changed (url: {current['url']})"
+    return "\n".join([summary, *diff])
+
+
+def _visible(elements) -> list:
+    visible = []
+    for el in elements:
+        try:
+            if el.is_displayed():
+                visible.append(el)
+        except Exception:
+            # Stale elements have gone from the page, which counts as not visible
+            pass
+    return visible
+
+
+def wait_for_condition(
+    driver: webdriver.Chrome,
+    condition: str,
+    selector: str = "",
+    by: str = "css",
+    timeout: float = 10.0,
+    stable_ms: int = 500,
+) -> str:
+    """Block until `condition` holds on the page, returning as soon as it does (or on timeout)."""
+    if condition not in WAIT_CONDITIONS:
+        return f"Unsupported condition: {condition}. Use one of {', '.join(WAIT_CONDITIONS)}"
+    by_key = BY_MAP.get(by)
+    if by_key is None:
+        return f"Unsupported selector strategy: {by}"
+    if condition == "spinner_gone" and not selector:
+        selector, by_key = DEFAULT_SPINNER_SELECTOR, By.CSS_SELECTOR
+    if condition in ("present", "absent", "enabled") and not selector:
+        return f"Condition '{condition}' needs a selector"
+
+    t0 = time.monotonic()
+    try:
+        if condition == "dom_idle":
+            driver.set_script_timeout(timeout + 5)
+            met = driver.execute_async_script(DOM_IDLE_JS, stable_ms, int(timeout * 1000))
+            if not met:
+                raise TimeoutException()
+        elif condition == "text_stable":
+            last = {"text": None, "since": time.monotonic()}
+
+            def text_is_stable(d):
+                el = d.find_element(by_key, selector) if selector else d.find_element(By.TAG_NAME, "body")
+                text = el.text
+                now = time.monotonic()
+                if text != last["text"]:
+                    last["text"], last["since"] = text, now
+                    return False
+                return (now - last["since"]) * 1000 >= stable_ms
+
+            WebDriverWait(driver, timeout, poll_frequency=0.1, ignored_exceptions=(NoSuchElementException,)).until(text_is_stable)
+        else:
+            def check(d):
+                elements = d.find_elements(by_key, selector)
+                if condition == "present":
+                    return bool(elements)
+                if condition == "enabled":
+                    return any(el.is_enabled() for el in _visible(elements))
+                # absent / spinner_gone
+                return not _visible(elements)
+
+            WebDriverWait(driver, timeout, poll_frequency=0.1).until(check)
+    except TimeoutException:
+        elapsed = time.monotonic() - t0
+        logger.info(f"[tool:wait_for] condition={condition} selector={selector} timed out after {elapsed:.2f}s")
+        return f"Timeout: '{condition}' not met after {elapsed:.2f}s"
+    except Exception as e:
+        logger.error(f"[tool:wait_for] Error: {e}")
+        return f"Error: {str(e)}"
+
+    elapsed = time.monotonic() - t0
+    logger.info(f"[tool:wait_for] condition={condition} selector={selector} met after {elapsed:.2f}s")
+    return f"OK: '{condition}' met after {elapsed:.2f}s"
+
+
+def watch_responses_until_complete(
+    driver: webdriver.Chrome,
+    panel_selector: str,
+    spinner_selector: str = "",
+    timeout: float = 120.0,
+    stable_ms: int = 1500,
+) -> Dict[str, Any]:
+    """Observe response panels in the page until they stop growing, and time each one.
+
+    Times are relative to the call, so this should be invoked straight after submitting a prompt:
+    `ttft_ms` is when a panel's text first changed and `complete_ms` when it last changed; `tail`
+    is the end of the panel's final text.
+    """
+    driver.set_script_timeout(timeout + 5)
+    raw = driver.execute_async_script(
+        RESPONSE_WATCH_JS, panel_selector, spinner_selector or DEFAULT_SPINNER_SELECTOR, int(stable_ms), int(timeout * 1000),
+        RESPONSE_TAIL_CHARS,
+    ) or {}
+
+    panels = []
+    for p in raw.get("panels", []):
+        responded = p.get("first_change_ms") is not None
+        panels.append({
+            "index": p.get("index"),
+            "label": p.get("label") or "",
+            "preexisting": bool(p.get("preexisting")),
+            "responded": responded,
+            "completed": responded and not raw.get("timed_out", True),
+            "ttft_ms": round(p["first_change_ms"]) if responded else None,
+            "complete_ms": round(p["last_change_ms"]) if responded else None,
+            "final_length": p.get("length", 0),
+            "tail": p.get("tail", ""),
+        })
+    return {
+        "timed_out": raw.get("timed_out", True),
+        "elapsed_ms": raw.get("elapsed_ms"),
+        "spinner_visible": raw.get("spinner_visible", False),
+        "panels": panels,
+    }
+
+
+def find_element(driver: webdriver.Chrome, selector: str, by: str, role: str = ""):
+    """Find an element by the given selector and/or the selector cached for `role` on this site.
+
+    The given selector is tried first, then the cached one. A cached selector that no longer finds
+    the element, or finds a different kind of element, is invalidated. When a role is given, the
+    selector that worked is cached for it, unless it is a per-page-load [data-pllm-id] one. Returns (element, by, selector); raises
+    NoSuchElementException if nothing matched, or ValueError for an unsupported strategy.
+    """
+    cache = shared_selector_cache()
+    host = host_of(driver.current_url)
+    cached = cache.get(host, role) if role else None
+    attempts = [(by, selector)] if selector else []
+    if cached and (cached["by"], cached["selector"]) not in attempts:
+        attempts.append((cached["by"], cached["selector"]))
+    if not attempts:
+        raise NoSuchElementException(f"No selector given and none cached for role '{role}'")
+
+    errors = []
+    for attempt_by, attempt_selector in attempts:
+        by_key = BY_MAP.get(attempt_by)
+        if by_key is None:
+            raise ValueError(f"Unsupported selector strategy: {attempt_by}")
+        is_cached = cached is not None and (attempt_by, attempt_selector) == (cached["by"], cached["selector"])
+        try:
+            el = driver.find_element(by_key, attempt_selector)
+        except NoSuchElementException:
+            errors.append(f"{attempt_by}={attempt_selector}: not found")
+            if is_cached:
+                cache.forget(host, role, "(no longer found)")
+            continue
+        fingerprint = element_fingerprint(el)
+        if is_cached and fingerprint != cached["fingerprint"]:
+            errors.append(f"{attempt_by}={attempt_selector}: now matches a different element ({fingerprint})")
+            cache.forget(host, role, f"(matched {fingerprint}, expected {cached['fingerprint']})")
+            continue
+        if role:
+            cache.remember(host, role, attempt_by, attempt_selector, fingerprint)
+        return el, attempt_by, attempt_selector
+    raise NoSuchElementException("; ".join(errors))
+
+
+def type_into(driver: webdriver.Chrome, selector: str, by: str, text: str, creds: Dict[str, str], role: str = "") -> str:
+    """Clear the element and type `text`, substituting <PASSWORD>/<EMAIL> from creds. Returns OK or an error string."""
+    if selector and by not in BY_MAP:
+        return f"Unsupported selector strategy: {by}"
+
+    # Replace known placeholders with runtime secrets (values used directly)
+    placeholder_map = {
+        "<PASSWORD>": creds.get("password", ""),
+        "<EMAIL>": creds.get("email", ""),
+    }
+    real_text = text
+    used_placeholders: List[str] = []
+    for placeholder, value in placeholder_map.items():
+        if placeholder in real_text:
+            real_text = real_text.replace(placeholder, value)
+            used_placeholders.append(placeholder)
+
+    try:
+        el, by, selector = find_element(driver, selector, by, role)
+        el.clear()
+        el.send_keys(real_text)
+        # Redacted logging
+        if used_placeholders:
+            logger.info(f"[tool:type_text] selector={selector} by={by} role={role} substituted={used_placeholders}")
+        else:
+            logger.info(f"[tool:type_text] selector={selector} by={by} role={role} text_len={len(real_text)}")
+        return "OK"
+    except Exception as e:
+        logger.error(f"[tool:type_text] Error: {e}")
+        return f"Error: {str(e)}"
+
+
+def click_element(driver: webdriver.Chrome, selector: str, by: str, role: str = "") -> str:
+    if selector and by not in BY_MAP:
+        return f"Unsupported selector strategy: {by}"
+    try:
+        el, by, selector = find_element(driver, selector, by, role)
+        el.click()
+        logger.info(f"[tool:click] selector={selector} by={by} role={role}")
+        return "OK"
+    except Exception as e:
+        logger.error(f"[tool:click] Error: {e}")
+        return f"Error: {str(e)}"
+
+
+def assert_element(driver: webdriver.Chrome, selector: str, by: str = "css", text: str = "", absent: bool = False) -> str:
+    by_key = BY_MAP.get(by)
+    if by_key is None:
+        return f"Unsupported selector strategy: {by}"
+    try:
+        elements = _visible(driver.find_elements(by_key, selector))
+        if absent:
+            return "OK" if not elements else f"Error: {len(elements)} visible element(s) match {by}={selector}"
+        if not elements:
+            return f"Error: no visible element matches {by}={selector}"
+        if text and not any(text in (el.text or "") for el in elements):
+            return f"Error: no visible {by}={selector} contains {text!r}"
+        return "OK"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+def run_action_sequence(driver: webdriver.Chrome, actions: List[Dict[str, Any]], creds: Dict[str, str]) -> str:
+    """Run type/click/wait/assert actions in order, stopping at the first that does not return OK."""
+    lines = []
+    failed = None
+    t0 = time.monotonic()
+    for i, action in enumerate(actions, start=1):
+        kind = action.get("action", "")
+        selector, by = action.get("selector", ""), action.get("by", "css")
+        if kind == "type":
+            result = type_into(driver, selector, by, action.get("text", ""), creds, action.get("role", ""))
+        elif kind == "click":
+            result = click_element(driver, selector, by, action.get("role", ""))
+        elif kind == "wait":
+            result = wait_for_condition(
+                driver, action.get("condition", ""), selector, by,
+                float(action.get("timeout", 10.0)), int(action.get("stable_ms", 500)),
+            )
+        elif kind == "assert":
+            result = assert_element(driver, selector, by, action.get("text", ""), bool(action.get("absent", False)))
+        else:
+            result = f"Unsupported action: {kind!r}. Use one of type, click, wait, assert"
+        lines.append(f"{i}. {kind} {selector or action.get('condition', '')}: {result}")
+        if not result.startswith("OK"):
+            failed = i
+            break
+
+    elapsed = time.monotonic() - t0
+    logger.info(f"[tool:run_actions] steps={len(lines)}/{len(actions)} failed_step={failed} seconds={elapsed:.2f}")
+    if failed is not None:
+        skipped = len(actions) - failed
+        summary = f"Error: step {failed}/{len(actions)} failed" + (f", {skipped} step(s) skipped" if skipped else "")
+    else:
+        summary = f"OK: all {len(actions)} action(s) succeeded in {elapsed:.2f}s"
+    return "\n".join([summary, *lines])
+
+
+def build_common_tools():
     """Build common tools for browser automation that can be used across different tasks.
 
-    Args:
-        driver: Selenium Chrome driver
-        creds: Optional credentials dictionary for placeholder substitution in type_text
+    The tools are run-agnostic: the driver (and the credentials used for placeholder substitution
+    in type_text) come from the RunContext in the config each tool is invoked with.
     """
-    creds = creds or {}
 
     @tool("get_page_html")
-    def get_page_html() -> str:
-        """Return the current page HTML with all <script>...</script> tags removed."""
-        html = driver.page_source
-        # Remove all <script>...</script> tags
-        cleaned = re.sub(r"<script\b[^>]*>[\s\S]*?<\/script>", "", html, flags=re.IGNORECASE)
-        # Extract only the <body>...</body> content if present
-        body_match = re.search(r"<body[^>]*>([\s\S]*?)<\/body>", cleaned, flags=re.IGNORECASE)
-        if body_match:
-            cleaned = body_match.group(1)
+    def get_page_html(config: RunnableConfig, mode: str = "") -> str:
+        """Return the current page.
+
+        mode="full": the <body> HTML with <script>, <style> and <noscript> elements and comments removed.
+        mode="compact": one line per visible interactive element or text block, as
+        `[id] tag role=... label=... "text" css=<selector>`; the css selector can be passed straight
+        to type_text/click with by='css'. Much smaller than full HTML, so prefer it.
+        Leave mode empty for the configured default.
+        """
+        driver = get_run_context(config).driver
+        mode = (mode or PAGE_HTML_MODE).lower()
+        if mode == "compact":
+            try:
+                compact = compact_dom(driver)
+                logger.info(f"[tool:get_page_html] mode=compact length={len(compact)} lines={compact.count(chr(10)) + 1}")
+                return compact
+            except Exception as e:
+                logger.warning(f"[tool:get_page_html] compact mode failed, returning full HTML: {e}")
+
+        # Only the <body>...</body> content, without scripts/styles/comments
+        cleaned = sanitize_html(page_source(driver), body_only=True)
         try:
             logger.info(f"[tool:get_page_html] sanitized_html_length={len(cleaned)} sanitized_html={cleaned[:20]}...")
         except Exception:
             logger.info("[tool:get_page_html] returned sanitized html")
         return cleaned
 
+    @tool("get_page_changes")
+    def get_page_changes(config: RunnableConfig) -> str:
+        """Return only what changed on the page since the last get_page_html(mode="compact") or
+        get_page_changes call, in compact form: "+" added, "-" removed, "~" changed lines.
+        Use this after type_text/click instead of fetching the whole page again.
+        """
+        try:
+            diff = page_changes(get_run_context(config).driver)
+        except Exception as e:
+            return f"Error: could not diff the page: {e}"
+        logger.info(f"[tool:get_page_changes] length={len(diff)}")
+        return diff
+
     @tool("type_text")
-    def type_text(selector: str, by: str, text: str) -> str:
+    def type_text(selector: str, by: str, text: str, config: RunnableConfig, role: str = "") -> str:
         """Type text into an element identified by a selector. 'by' is one of css,id,name,xpath.
 
+        Pass a semantic `role` (e.g. email_field, password_field, prompt_box) to use and maintain the
+        site's selector cache: with an empty selector the cached one is used, and a selector that
+        works is remembered for the role.
+
         Placeholder policy: Do not include raw secrets. Use placeholders like <PASSWORD>, <EMAIL>.
         They will be substituted with secure values from creds at runtime.
         """
-        by_map = {
-            "css": By.CSS_SELECTOR,
-            "id": By.ID,
-            "name": By.NAME,
-            "xpath": By.XPATH,
-        }
-        by_key = by_map.get(by)
-        if by_key is None:
-            return f"Unsupported selector strategy: {by}"
-
-        # Replace known placeholders with runtime secrets (values used directly)
-        placeholder_map = {
-            "<PASSWORD>": creds.get("password", ""),
-            "<EMAIL>": creds.get("email", ""),
-        }
-        real_text = text
-        used_placeholders: List[str] = []
-        for placeholder, value in placeholder_map.items():
-            if placeholder in real_text:
-                real_text = real_text.replace(placeholder, value)
-                used_placeholders.append(placeholder)
-
-        try:
-            el = driver.find_element(by_key, selector)
-            el.clear()
-            el.send_keys(real_text)
-            # Redacted logging
-            if used_placeholders:
-                logger.info(f"[tool:type_text] selector={selector} by={by} substituted={used_placeholders}")
-            else:
-                logger.info(f"[tool:type_text] selector={selector} by={by} text_len={len(real_text)}")
-            return "OK"
-        except Exception as e:
-            logger.error(f"[tool:type_text] Error: {e}")
-            return f"Error: {str(e)}"
+        ctx = get_run_context(config)
+        return type_into(ctx.driver, selector, by, text, ctx.creds, role)
 
     @tool("click")
-    def click(selector: str, by: str) -> str:
-        """Click an element identified by a selector. 'by' is one of css,id,name,xpath."""
-        by_map = {
-            "css": By.CSS_SELECTOR,
-            "id": By.ID,
-            "name": By.NAME,
-            "xpath": By.XPATH,
-        }
-        by_key = by_map.get(by)
-        if by_key is None:
-            return f"Unsupported selector strategy: {by}"
-        try:
-            el = driver.find_element(by_key, selector)
-            el.click()
-            logger.info(f"[tool:click] selector={selector} by={by}")
-            return "OK"
-        except Exception as e:
-            logger.error(f"[tool:click] Error: {e}")
-            return f"Error: {str(e)}"
+    def click(selector: str, by: str, config: RunnableConfig, role: str = "") -> str:
+        """Click an element identified by a selector. 'by' is one of css,id,name,xpath.
+
+        Pass a semantic `role` (e.g. login_button, submit_button) to use and maintain the site's
+        selector cache, as for type_text.
+        """
+        return click_element(get_run_context(config).driver, selector, by, role)
+
+    @tool("run_actions")
+    def run_actions(actions: List[Dict[str, Any]], config: RunnableConfig) -> str:
+        """Run a sequence of browser actions in one call, stopping at the first failure.
+
+        Each action is a dict with an "action" key:
+        - {"action": "type", "selector", "by", "text", "role"?}: as type_text (placeholders apply)
+        - {"action": "click", "selector", "by", "role"?}: as click
+        - {"action": "wait", "condition", "selector"?, "by"?, "timeout"?, "stable_ms"?}: as wait_for
+        - {"action": "assert", "selector", "by"?, "text"?, "absent"?}: a visible element matches
+          (and contains "text" if given), or with "absent": true, no visible element matches
+        'by' defaults to css. Returns one result line per step; the first line starts with OK when
+        every step succeeded, otherwise with Error and the failing step.
+        """
+        ctx = get_run_context(config)
+        return run_action_sequence(ctx.driver, actions, ctx.creds)
+
+    @tool("get_cached_selectors")
+    def get_cached_selectors(config: RunnableConfig) -> str:
+        """Return the selectors cached for this site by semantic role, as JSON {role: {by, selector}}.
+
+        Check this before reading the page: a cached role can be used directly by passing it as
+        `role` (with an empty selector) to type_text/click. Entries that stop working are dropped.
+        """
+        driver = get_run_context(config).driver
+        entries = shared_selector_cache().all(host_of(driver.current_url))
+        logger.info(f"[tool:get_cached_selectors] roles={sorted(entries)}")
+        return json.dumps({
+            "roles": {role: {"by": e["by"], "selector": e["selector"]} for role, e in entries.items()},
+            "suggested_role_names": list(COMMON_ROLES),
+        })
 
     @tool("sleep")
     def sleep(seconds: float) -> str:
-        """Sleep for a number of seconds to allow the page to update."""
+        """Sleep for a number of seconds to allow the page to update. Prefer wait_for, which returns as soon as the page is ready."""
         time.sleep(float(seconds))
         logger.info(f"[tool:sleep] seconds={seconds}")
         return "OK"
 
-    return [get_page_html, type_text, click, sleep]
+    @tool("wait_for")
+    def wait_for(condition: str, config: RunnableConfig, selector: str = "", by: str = "css", timeout: float = 10.0, stable_ms: int = 500) -> str:
+        """Wait until a page condition holds, returning as soon as it does (or after `timeout` seconds).
+
+        condition is one of:
+        - present: an element matching selector exists
+        - absent: no visible element matches selector
+        - enabled: a visible element matching selector is enabled
+        - text_stable: the text of selector (or the whole body if no selector) is unchanged for stable_ms
+        - spinner_gone: no visible loading spinner (selector optional, defaults to common spinner patterns)
+        - dom_idle: the page has had no DOM changes for stable_ms (network/rendering has settled)
+        'by' is one of css,id,name,xpath.
+        """
+        driver = get_run_context(config).driver
+        return wait_for_condition(driver, condition, selector, by, float(timeout), int(stable_ms))
+
+    return [get_page_html, get_page_changes, get_cached_selectors, type_text, click, run_actions, sleep, wait_for]
 
 
-def build_login_tools(driver: webdriver.Chrome, creds: Dict[str, str], is_logged_in_func, graph_artefacts_dir: List[str]):
+def build_login_tools(is_logged_in_func):
     """Build tools for login automation.
 
     Args:
-        driver: Selenium Chrome driver
-        creds: Credentials dictionary
         is_logged_in_func: Function to check if user is logged in
-        graph_artefacts_dir: List containing artefacts directory path
     """
-    # Get common tools with credentials support
-    common_tools = build_common_tools(driver, creds)
+    # Get common tools (credentials are taken from the run context)
+    common_tools = build_common_tools()
 
     # Add login-specific tools
     @tool("check_is_logged_in")
-    def check_is_logged_in() -> bool:
+    def check_is_logged_in(config: RunnableConfig) -> bool:
         """Return True if the user appears to be logged in on the current page."""
-        result = is_logged_in_func(driver)
+        result = is_logged_in_func(get_run_context(config).driver)
         logger.info(f"[tool:check_is_logged_in] result={result}")
         return result
 
     @tool("navigate")
-    def navigate(url: str) -> str:
+    def navigate(url: str, config: RunnableConfig) -> str:
         """Navigate the browser to a URL."""
+        driver = get_run_context(config).driver
         driver.get(url)
         logger.info(f"[tool:navigate] url={url}")
         return driver.current_url
 
     @tool("post_login_capture")
-    def post_login_capture() -> str:
+    def post_login_capture(config: RunnableConfig) -> str:
         """Save HTML and a screenshot after login to the artefacts directory."""
-        out_dir = Path(graph_artefacts_dir[0])
+        ctx = get_run_context(config)
+        driver, out_dir = ctx.driver, Path(ctx.artefacts_dir)
         save_html(driver, out_dir, "post_login")
         save_screenshot(driver, out_dir, "post_login")
         logger.info(f"[tool:post_login_capture] saved to {out_dir}")
@@ -167,27 +549,52 @@ def build_login_tools(driver: webdriver.Chrome, creds: Dict[str, str], is_logged
     return common_tools + [check_is_logged_in, navigate, post_login_capture]
 
 
-def build_chat_tools(driver: webdriver.Chrome, graph_artefacts_dir: List[str]):
-    """Build tools for chat interface automation.
-
-    Args:
-        driver: Selenium Chrome driver
-        graph_artefacts_dir: List containing artefacts directory path
-    """
+def build_chat_tools():
+    """Build tools for chat interface automation. The driver and artefacts dir come from the run context."""
     # Get common tools (no credentials needed for chats)
-    common_tools = build_common_tools(driver, creds={})
+    common_tools = build_common_tools()
 
     # Add chat-specific tools
 
     @tool("save_chat_capture")
-    def save_chat_capture(name: str) -> str:
+    def save_chat_capture(name: str, config: RunnableConfig) -> str:
         """Save HTML and screenshot to artefacts directory."""
-        out_dir = Path(graph_artefacts_dir[0])
+        ctx = get_run_context(config)
+        driver, out_dir = ctx.driver, Path(ctx.artefacts_dir)
         save_html(driver, out_dir, name)
         save_screenshot(driver, out_dir, name)
         logger.info(f"[tool:save_chat_capture] saved {name} to {out_dir}")
         return str(out_dir)
 
+    @tool("watch_responses")
+    def watch_responses(panel_selector: str, config: RunnableConfig, spinner_selector: str = "", timeout: float = 120.0, stable_ms: int = 1500) -> str:
+        """Wait until all LLM responses have finished generating and report timings per response panel.
+
+        Call this IMMEDIATELY after clicking submit. panel_selector is a CSS selector matching every
+        LLM response panel; spinner_selector optionally matches the 'generating' indicator (defaults
+        to common spinner patterns). Returns JSON with, per panel: label, whether it responded and
+        completed, time to first text (ttft_ms), time to completion (complete_ms), final_length and
+        the end of its final text (tail) - check it for empty or error responses.
+        """
+        ctx = get_run_context(config)
+        try:
+            result = watch_responses_until_complete(ctx.driver, panel_selector, spinner_selector, float(timeout), int(stable_ms))
+        except Exception as e:
+            logger.error(f"[tool:watch_responses] Error: {e}")
+            return f"Error: {str(e)}"
+
+        # Keep the timings as run metrics alongside the other artefacts
+        out_dir = Path(ctx.artefacts_dir)
+        with (out_dir / "response_metrics.jsonl").open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": datetime.utcnow().isoformat(), **result}) + "\n")
+        for p in result["panels"]:
+            logger.info(
+                f"[tool:watch_responses] panel={p['index']} label={p['label']!r} responded={p['responded']} "
+                f"ttft_ms={p['ttft_ms']} complete_ms={p['complete_ms']} final_length={p['final_length']}"
+            )
+        logger.info(f"[tool:watch_responses] timed_out={result['timed_out']} elapsed_ms={result['elapsed_ms']}")
+        return json.dumps(result)
+
     @tool("report_completion")
     def report_completion(health: str, health_description: str) -> str:
         """Report task completion with health status.
@@ -199,5 +606,5 @@ def build_chat_tools(driver: webdriver.Chrome, graph_artefacts_dir: List[str]):
         logger.info(f"[tool:report_completion] health={health}, description={health_description}")
         return f"Completion reported: health={health}, description={health_description}"
 
-    return common_tools + [save_chat_capture, report_completion]
+    return common_tools + [save_chat_capture, watch_responses, report_completion]
 
@@ -0,0 +1,289 @@
+#  Copyright (C) 2025 lukerm of www.zl-labs.tech
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""Execution traces of graph runs.
+
+A run's trace is streamed to `execution_trace.jsonl` in its artefacts directory, one compact
+record per line, as it happens:
+
+    {"record": "header", "run_id": ..., "run_type": ..., "timestamp": ...}
+    {"record": "blob", "hash": ..., "content": ...}                                   (once per large body)
+    {"record": "step", "step": {<node>: {"status": ..., "messages": [...], ...}}}   (one per graph step)
+    {"record": "error", "error": ..., "error_type": ...}                              (only if the run crashed)
+    {"record": "summary", "final_status": ..., "final_health": ..., "total_steps": ...}
+
+Message bodies of TRACE_BLOB_MIN_CHARS or more (page HTML, mostly) are stored once as a blob,
+keyed by their sha256, and messages refer to them with "content_ref" instead of "content".
+The same page fetched several times in a run is therefore written only once.
+
+With ARTEFACT_COMPRESSION set, the file is written compressed (execution_trace.jsonl.gz/.zst),
+flushed after every record so that it stays readable up to the last complete one.
+
+`read_trace` turns this back into the single JSON document earlier versions wrote to
+`execution_trace.json` (and still reads such files), with blob references resolved, or kept
+as references plus a top-level "blobs" map for a compact copy.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Union
+
+from .compression import base_suffix, compressed_name, find_artefact, open_text
+
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = "execution_trace.jsonl"
+LEGACY_TRACE_FILE = "execution_trace.json"
+# fsync after every record, so a crash (or a killed container) loses at most the step in flight
+TRACE_FSYNC = os.getenv("TRACE_FSYNC", "1").lower() not in ("0", "false", "no")
+# Message bodies at least this long are stored once as content-addressed blobs (0 disables)
+TRACE_BLOB_MIN_CHARS = int(os.getenv("TRACE_BLOB_MIN_CHARS", "2048"))
+
+
+def message_to_dict(msg: Any, store_blob: Optional[Callable[[str], str]] = None) -> dict:
+    """Convert a LangChain message to a JSON-serializable dict.
+
+    With `store_blob`, a large string body is replaced by a reference to the hash it returns.
+    """
+    content = msg.content
+    if store_blob is not None and isinstance(content, str) and TRACE_BLOB_MIN_CHARS and len(content) >= TRACE_BLOB_MIN_CHARS:
+        result = {"type": msg.__class__.__name__, "content_ref": store_blob(content), "content_length": len(content)}
+    else:
+        result = {"type": msg.__class__.__name__, "content": content}
+    if hasattr(msg, "tool_calls") and msg.tool_calls:
+        result["tool_calls"] = [
+            {"name": tc.get("name"), "args": tc.get("args"), "id": tc.get("id")}
+            for tc in msg.tool_calls
+        ]
+    if hasattr(msg, "tool_call_id"):
+        result["tool_call_id"] = msg.tool_call_id
+    return result
+
+
+def step_to_dict(step: Dict[str, Any], store_blob: Optional[Callable[[str], str]] = None) -> Dict[str, Any]:
+    """Convert one graph stream update ({node: state update}) to its trace form."""
+    step_data = {}
+    for node_name, node_state in step.items():
+        node_state = node_state or {}
+        step_data[node_name] = {
+            "status": node_state.get("status"),
+            "health": node_state.get("health"),
+            "health_description": node_state.get("health_description"),
+            "goal": node_state.get("goal"),
+            "messages": [message_to_dict(msg, store_blob) for msg in node_state.get("messages", [])],
+            "artefacts_dir": node_state.get("artefacts_dir"),
+        }
+    return step_data
+
+
+class TraceWriter:
+    """Appends trace records to `execution_trace.jsonl` as the run progresses.
+
+    Use as a context manager: if the block raises, an error record and a summary are written
+    before the exception propagates, so the trace of a crashed run is still complete.
+    """
+
+    def __init__(self, artefacts_dir: Path, fsync: bool = TRACE_FSYNC):
+        self.path = Path(artefacts_dir) / compressed_name(TRACE_FILE)
+        self.fsync = fsync
+        self.run_id = str(uuid.uuid4())
+        self.total_steps = 0
+        self.last_step: Optional[Dict[str, Any]] = None
+        self.summary: Optional[Dict[str, Any]] = None
+        self._blobs: set = set()
+        self._blob_chars_saved = 0
+        self._f = open_text(self.path, "w")
+        self._write({
+            "record": "header",
+            "run_id": self.run_id,
+            "run_type": Path(artefacts_dir).name,
+            "timestamp": datetime.utcnow().isoformat(),
+        })
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+
+    def _store_blob(self, content: str) -> str:
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if digest in self._blobs:
+            self._blob_chars_saved += len(content)
+        else:
+            self._blobs.add(digest)
+            self._write({"record": "blob", "hash": digest, "content": content})
+        return digest
+
+    def write_step(self, step: Dict[str, Any]) -> None:
+        self._write({"record": "step", "step": step_to_dict(step, self._store_blob)})
+        self.total_steps += 1
+        self.last_step = step
+        logger.debug(f"Captured step {self.total_steps}: {list(step.keys())}")
+
+    def finalise(self, **extra: Any) -> Dict[str, Any]:
+        """Write the summary record (final status/health from the last step) and close the file."""
+        if self.summary is not None:
+            return self.summary
+        summary: Dict[str, Any] = {"record": "summary", "total_steps": self.total_steps}
+        for node_state in (self.last_step or {}).values():
+            node_state = node_state or {}
+            if "status" in node_state:
+                summary["final_status"] = node_state.get("status")
+            if "health" in node_state:
+                summary["final_health"] = node_state.get("health")
+            if "health_description" in node_state:
+                summary["final_health_description"] = node_state.get("health_description")
+        summary.update(extra)
+        self._write(summary)
+        self._f.close()
+        self.summary = summary
+        logger.info(
+            f"Execution trace saved to: {self.path} ({len(self._blobs)} blob(s), "
+            f"{self._blob_chars_saved} duplicate characters not rewritten)"
+        )
+        return summary
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None and self.summary is None:
+            self._write({"record": "error", "error": str(exc), "error_type": exc_type.__name__})
+            self.finalise(final_status="error")
+        elif self.summary is None:
+            self.finalise()
+
+
+def _result(writer: TraceWriter) -> Dict[str, Any]:
+    """What run_and_save_execution_trace returns: the trace path plus final status and health."""
+    final_state = next(iter((writer.last_step or {}).values()), None) or {}
+    return {
+        "trace_file": writer.path,
+        "final_status": writer.summary.get("final_status"),
+        "health": final_state.get("health", "UNKNOWN") if writer.last_step else "UNKNOWN",
+        "health_description": final_state.get("health_description", "No description") if writer.last_step else "No final state",
+    }
+
+
+def run_and_save_execution_trace(stream: Iterable[Dict[str, Any]], artefacts_dir: Path) -> Dict[str, Any]:
+    """Consume a graph stream, writing each step to the trace as it arrives.
+
+    Returns {"trace_file", "final_status", "health", "health_description"}.
+    """
+    with TraceWriter(artefacts_dir) as writer:
+        for step in stream:
+            writer.write_step(step)
+    return _result(writer)
+
+
+async def arun_and_save_execution_trace(astream: AsyncIterator[Dict[str, Any]], artefacts_dir: Path) -> Dict[str, Any]:
+    """Async variant of run_and_save_execution_trace, consuming an `app.astream(...)` iterator."""
+    writer = await asyncio.to_thread(TraceWriter, artefacts_dir)
+    with writer:
+        async for step in astream:
+            await asyncio.to_thread(writer.write_step, step)
+    return _result(writer)
+
+
+def trace_file_in(folder: Path) -> Optional[Path]:
+    """The trace file in a run (or error) folder, streamed or legacy, compressed or not, if any."""
+    for name in (TRACE_FILE, LEGACY_TRACE_FILE):
+        found = find_artefact(folder, name)
+        if found is not None:
+            return found
+    return None
+
+
+def _resolve_blobs(trace: Dict[str, Any], blobs: Dict[str, str]) -> None:
+    for step in trace.get("steps", []):
+        for node_state in step.values():
+            for msg in (node_state or {}).get("messages", []):
+                ref = msg.get("content_ref")
+                if ref in blobs:
+                    msg["content"] = blobs[ref]
+                    del msg["content_ref"]
+                    msg.pop("content_length", None)
+
+
+def read_trace(path: Union[Path, str], resolve_blobs: bool = True) -> Dict[str, Any]:
+    """Load a trace as the single JSON document shape, from a .jsonl/.json file or the folder holding it.
+
+    A streamed trace that was cut off mid-record (e.g. the process was killed) is read up to the
+    last complete record. With `resolve_blobs=False`, messages keep their "content_ref" and the
+    blobs are returned once, under a top-level "blobs" key.
+    """
+    path = Path(path)
+    if path.is_dir():
+        found = trace_file_in(path)
+        if found is None:
+            raise FileNotFoundError(f"No execution trace in {path}")
+        path = found
+    if base_suffix(path) == ".json":
+        with open_text(path, "r") as f:
+            trace = json.load(f)
+        if resolve_blobs and "blobs" in trace:
+            _resolve_blobs(trace, trace.pop("blobs"))
+        return trace
+
+    header: Dict[str, Any] = {}
+    blobs: Dict[str, str] = {}
+    steps = []
+    error: Optional[Dict[str, Any]] = None
+    summary: Dict[str, Any] = {}
+    with open_text(path, "r") as f:
+        lines = iter(f)
+        complete = 0
+        while True:
+            try:
+                line = next(lines)
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+            except StopIteration:
+                break
+            except Exception as e:
+                # A cut-off line, or a compressed stream that ends mid-block
+                logger.warning(f"Ignoring incomplete trace record at {path} after {complete} record(s): {type(e).__name__}")
+                break
+            complete += 1
+            kind = record.pop("record", None)
+            if kind == "header":
+                header = record
+            elif kind == "blob":
+                blobs[record["hash"]] = record["content"]
+            elif kind == "step":
+                steps.append(record["step"])
+            elif kind == "error":
+                error = record
+            elif kind == "summary":
+                summary = record
+
+    trace = {**header, "steps": steps}
+    if error is not None:
+        trace["error"] = error
+    trace.update(summary)
+    trace.setdefault("total_steps", len(steps))
+    if resolve_blobs:
+        _resolve_blobs(trace, blobs)
+    elif blobs:
+        trace["blobs"] = blobs
+    return trace